@@ -0,0 +1,89 @@
+"""
+  run scenes headless, many at once \n
+  python batch.py scene1.json scene2.json --steps 600 --processes 8 --output results.json \n
+  a scene file is json: {"bodies": [{"points": [[x, y], ...], "immovable": false, "velocity": [vx, vy], "rotational_velocity": w}, ...]}
+  (only "points" is required). Bodies keep the order of the file, their body_id is their index
+"""
+import argparse
+import json
+import sys
+import time
+from multiprocessing import Pool
+from typing import Any
+from pygame.math import Vector2
+from physics import PhysicsWorld
+
+def load_scene(path: str) -> PhysicsWorld:
+  with open(path) as f:
+    scene = json.load(f)
+  world = PhysicsWorld()
+  for body in scene['bodies']:
+    b = world.add_polygonal_body([Vector2(x, y) for (x, y) in body['points']], body.get('immovable', False))
+    if 'velocity' in body:
+      b.linear_velocity = Vector2(body['velocity'])
+    b.rotational_velocity = body.get('rotational_velocity', 0)
+  return world
+
+def run_scene(path: str, steps: int, dt: float) -> dict[str, Any]:
+  """
+    final state of every body, and how long the steps took
+  """
+  step_times: list[float] = []
+  with load_scene(path) as world:
+    for _ in range(steps):
+      start = time.perf_counter()
+      world.update(dt)
+      step_times.append(time.perf_counter() - start)
+  total = sum(step_times)
+  return {
+    'scene': path,
+    'steps': steps,
+    'seconds': total,
+    'mean_step_ms': 1000 * total / steps if steps else 0,
+    'max_step_ms': 1000 * max(step_times, default=0),
+    'bodies': [
+      {
+        'body_id': b.body_id,
+        'position': list(b.center_of_mass),
+        'rotation': b.rotational_displacement,
+        'velocity': list(b.linear_velocity),
+        'rotational_velocity': b.rotational_velocity,
+        'resting': b.resting,
+      }
+      for b in world.bodies
+    ],
+  }
+
+def run_scenes(paths: list[str], steps: int, dt: float, processes: int | None = None) -> list[dict[str, Any]]:
+  """
+    one world per worker process, results in the order of paths
+  """
+  if processes == 1 or len(paths) <= 1:
+    return [run_scene(p, steps, dt) for p in paths]
+  with Pool(processes) as pool:
+    return pool.starmap(run_scene, [(p, steps, dt) for p in paths])
+
+def main(argv: list[str] | None = None):
+  parser = argparse.ArgumentParser(description='run physics scenes without a window')
+  parser.add_argument('scenes', nargs='+', help='scene json files')
+  parser.add_argument('--steps', type=int, default=600, help='number of steps per scene')
+  parser.add_argument('--dt', type=float, default=1/60, help='length of a step in seconds')
+  parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per core)')
+  parser.add_argument('--output', default=None, help='write results here as json (default: stdout)')
+  args = parser.parse_args(argv)
+
+  start = time.perf_counter()
+  results = run_scenes(args.scenes, args.steps, args.dt, args.processes)
+  wall = time.perf_counter() - start
+  out = json.dumps(results, indent=2)
+  if args.output:
+    with open(args.output, 'w') as f:
+      f.write(out)
+  else:
+    print(out)
+  for r in results:
+    print(f"{r['scene']}: {r['steps']} steps in {r['seconds']:.3f}s ({r['mean_step_ms']:.3f} ms/step, max {r['max_step_ms']:.3f} ms)", file=sys.stderr)
+  print(f"{len(results)} scenes in {wall:.3f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,104 @@
+import math
+import numpy as np
+
+class BodyStore:
+  """
+    physical state of every body, one row per body, in contiguous arrays \n
+    pos: center of mass, rot: rotational displacement, vel / ang_vel: linear / rotational velocity,
+    acc / ang_acc: linear / rotational acceleration \n
+    prev_pos / prev_rot: pos and rot at the start of the last step, for interpolated drawing \n
+    world: index of the world the body belongs to, when several worlds share a store (see WorldBatch) \n
+    mass / inertia: as given (-1 for immovable), inv_mass / inv_inertia: their inverses (0 for immovable) \n
+    only the first 'count' rows are in use, bodies (RigidBody) read and write their row through 'index' \n
+    layout: changes whenever bodies get other rows (compact, clear), anything keeping rows must fetch them again
+  """
+  def __init__(self, capacity: int = 16) -> None:
+    self.count = 0
+    self.layout = 0
+    self.pos = np.zeros((capacity, 2))
+    self.rot = np.zeros(capacity)
+    self.vel = np.zeros((capacity, 2))
+    self.ang_vel = np.zeros(capacity)
+    self.acc = np.zeros((capacity, 2))
+    self.ang_acc = np.zeros(capacity)
+    self.mass = np.zeros(capacity)
+    self.inertia = np.zeros(capacity)
+    self.inv_mass = np.zeros(capacity)
+    self.inv_inertia = np.zeros(capacity)
+    self.prev_pos = np.zeros((capacity, 2))
+    self.prev_rot = np.zeros(capacity)
+    self.world = np.zeros(capacity, dtype=int)
+
+  def arrays(self) -> list[str]:
+    return ['pos', 'rot', 'vel', 'ang_vel', 'acc', 'ang_acc', 'mass', 'inertia', 'inv_mass', 'inv_inertia', 'prev_pos', 'prev_rot', 'world']
+
+  def allocate(self) -> int:
+    """
+      index of a new zeroed row, the arrays double in size when full
+    """
+    capacity = len(self.rot)
+    if self.count == capacity:
+      for name in self.arrays():
+        old = getattr(self, name)
+        new = np.zeros((2 * capacity,) + old.shape[1:], dtype=old.dtype)
+        new[:capacity] = old
+        setattr(self, name, new)
+    self.count += 1
+    return self.count - 1
+
+  def compact(self, bodies: list) -> None:
+    """
+      keep only the rows of 'bodies' (RigidBody), moved to the front in the same order \n
+      rows of bodies not in the list are dropped
+    """
+    rows = np.array([b.index for b in bodies], dtype=int)
+    for name in self.arrays():
+      arr = getattr(self, name)
+      arr[:len(rows)] = arr[rows]
+      arr[len(rows):] = 0
+    for (i, b) in enumerate(bodies):
+      b.index = i
+    self.count = len(bodies)
+    self.layout += 1
+
+  def clear(self):
+    """
+      drop every row, the bodies must allocate one again
+    """
+    self.count = 0
+    self.layout += 1
+
+  def rows(self, bodies: list) -> np.ndarray:
+    """
+      row of each body (RigidBody), to index the arrays with
+    """
+    return np.array([b.index for b in bodies], dtype=int)
+
+  def save_previous(self, rows: np.ndarray | int | None = None):
+    """
+      remember the current transform of 'rows' (default: every body) as the previous one
+    """
+    if rows is None:
+      rows = np.arange(self.count)
+    self.prev_pos[rows] = self.pos[rows]
+    self.prev_rot[rows] = self.rot[rows]
+
+  def clear_forces(self, rows: np.ndarray):
+    self.acc[rows] = 0
+    self.ang_acc[rows] = 0
+
+  def apply_gravity(self, rows: np.ndarray, gravity: float):
+    """
+      downwards acceleration of 'gravity' on the movable bodies among rows
+    """
+    movable = rows[self.mass[rows] > 0]
+    self.acc[movable, 1] -= gravity
+
+  def integrate(self, rows: np.ndarray, dt: float):
+    """
+      semi-implicit euler step for the given rows: the velocities first, then the positions with the new velocities
+    """
+    self.vel[rows] += self.acc[rows] * dt
+    self.ang_vel[rows] += self.ang_acc[rows] * dt
+    self.pos[rows] += self.vel[rows] * dt
+    self.rot[rows] = np.mod(self.rot[rows] + self.ang_vel[rows] * dt, 2*math.pi)
@@ -0,0 +1,427 @@
+from abc import ABC, abstractmethod
+from typing import cast
+from pygame.math import Vector2
+from classes import Polygon
+from collusion import TOUCH_MARGIN
+
+Pair = tuple[Polygon, Polygon]
+AABB = tuple[float, float, float, float]
+
+def aabb_overlap(a: AABB, b: AABB, margin: float = 0) -> bool:
+  """
+    true if the boxes touch or overlap after growing both of them by 'margin'
+  """
+  return a[0] - margin <= b[2] + margin and b[0] - margin <= a[2] + margin \
+     and a[1] - margin <= b[3] + margin and b[1] - margin <= a[3] + margin
+
+def grow(box: AABB, margin: float) -> AABB:
+  return (box[0] - margin, box[1] - margin, box[2] + margin, box[3] + margin)
+
+def union(a: AABB, b: AABB) -> AABB:
+  return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+def contains(outer: AABB, inner: AABB) -> bool:
+  return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+def perimeter(box: AABB) -> float:
+  return 2 * ((box[2] - box[0]) + (box[3] - box[1]))
+
+def order_pair(a: Polygon, b: Polygon, position: dict[Polygon, int]) -> Pair:
+  """
+    order the pair the same way the bodies appear in the engine's body list
+  """
+  return (a, b) if position[a] < position[b] else (b, a)
+
+class Broadphase(ABC):
+  """
+    finds pairs of bodies which might be colliding, so the narrowphase ('collide') \n
+    does not need to be run on every pair
+  """
+  @abstractmethod
+  def get_pairs(self, bodies: list[Polygon], margin: float = 0) -> list[Pair]:
+    """
+      candidate pairs whose bounding boxes overlap after growing each box by 'margin' \n
+      the result may contain extra pairs, but never misses an overlapping one \n
+      within a pair, bodies are in the same order as in 'bodies'
+    """
+
+  def reset(self):
+    """
+      forget what is kept between calls, eg. after the bodies were put back to an earlier state
+    """
+
+class BruteForce(Broadphase):
+  """
+    every pair of bodies, O(n^2)
+  """
+  def get_pairs(self, bodies: list[Polygon], margin: float = 0) -> list[Pair]:
+    return [(bodies[i], bodies[j]) for i in range(len(bodies)) for j in range(i + 1, len(bodies))]
+
+class SweepAndPrune(Broadphase):
+  """
+    sort and sweep along the x axis \n
+    the sorted order is kept between calls. Bodies only move a little per frame, so the
+    insertion sort is close to O(n), and the sweep is O(n + k) for k overlapping pairs on x
+  """
+  def __init__(self) -> None:
+    self.order: list[Polygon] = []
+    self.members: set[Polygon] = set()
+
+  def reset(self):
+    self.order = []
+    self.members = set()
+
+  def sync(self, bodies: list[Polygon]):
+    """
+      add bodies which are new, and drop bodies which are no longer in the engine
+    """
+    if len(bodies) == len(self.members) and self.members.issuperset(bodies):
+      return
+    members = set(bodies)
+    self.order = [b for b in self.order if b in members] + [b for b in bodies if b not in self.members]
+    self.members = members
+
+  def get_pairs(self, bodies: list[Polygon], margin: float = 0) -> list[Pair]:
+    self.sync(bodies)
+    order = self.order
+    boxes = [b.get_aabb_global() for b in order]
+
+    # insertion sort by x_min, nearly sorted from the last frame
+    for i in range(1, len(order)):
+      body = order[i]
+      box = boxes[i]
+      j = i - 1
+      while j >= 0 and boxes[j][0] > box[0]:
+        order[j + 1] = order[j]
+        boxes[j + 1] = boxes[j]
+        j -= 1
+      order[j + 1] = body
+      boxes[j + 1] = box
+
+    position = {b: i for i, b in enumerate(bodies)}
+    pairs: list[Pair] = []
+    for i in range(len(order)):
+      box = boxes[i]
+      x_max = box[2] + 2 * margin
+      j = i + 1
+      while j < len(order) and boxes[j][0] <= x_max:
+        other = boxes[j]
+        if box[1] - margin <= other[3] + margin and other[1] - margin <= box[3] + margin:
+          pairs.append(order_pair(order[i], order[j], position))
+        j += 1
+    return pairs
+
+class SpatialHashGrid(Broadphase):
+  """
+    uniform grid hashed by cell coordinates \n
+    good for dense scenes of similar sized bodies, cell_size should be about the size of a body
+  """
+  def __init__(self, cell_size: float = 100) -> None:
+    self.cell_size = cell_size
+
+  def get_pairs(self, bodies: list[Polygon], margin: float = 0) -> list[Pair]:
+    size = self.cell_size
+    boxes: list[AABB] = []
+    cell_ranges: list[tuple[int, int, int, int]] = []
+    cells: dict[tuple[int, int], list[int]] = {}
+    for i, b in enumerate(bodies):
+      box = b.get_aabb_global()
+      x0 = int((box[0] - margin) // size)
+      y0 = int((box[1] - margin) // size)
+      x1 = int((box[2] + margin) // size)
+      y1 = int((box[3] + margin) // size)
+      boxes.append(box)
+      cell_ranges.append((x0, y0, x1, y1))
+      for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+          cells.setdefault((x, y), []).append(i)
+
+    pairs: list[Pair] = []
+    for (x, y), idxs in cells.items():
+      for a in range(len(idxs)):
+        i = idxs[a]
+        ri = cell_ranges[i]
+        for c in range(a + 1, len(idxs)):
+          j = idxs[c]
+          rj = cell_ranges[j]
+          # a pair sharing several cells is only reported from the first one they share
+          if x != max(ri[0], rj[0]) or y != max(ri[1], rj[1]):
+            continue
+          if aabb_overlap(boxes[i], boxes[j], margin):
+            pairs.append((bodies[i], bodies[j]))
+    return pairs
+
+class TreeNode:
+  def __init__(self, box: AABB, body: Polygon | None = None) -> None:
+    """
+      body: set for leaves only
+    """
+    self.box = box
+    self.body = body
+    self.parent: TreeNode | None = None
+    self.left: TreeNode | None = None
+    self.right: TreeNode | None = None
+    self.height = 0
+
+  def is_leaf(self):
+    return self.left is None
+
+class DynamicAABBTree(Broadphase):
+  """
+    bounding volume tree over the bodies \n
+    each leaf holds a fattened box, and is only reinserted once the body moves outside of it,
+    so resting bodies cost almost nothing per frame. Overlapping leaves are cached between calls,
+    and only the pairs of reinserted leaves are searched again
+  """
+  def __init__(self, fat_margin: float = 10) -> None:
+    """
+      fat_margin: how far a body can move before its leaf is reinserted
+    """
+    self.fat_margin = fat_margin
+    self.root: TreeNode | None = None
+    self.leaves: dict[Polygon, TreeNode] = {}
+    self.neighbours: dict[Polygon, set[Polygon]] = {}
+
+  def reset(self):
+    self.root = None
+    self.leaves = {}
+    self.neighbours = {}
+
+  # tree structure
+
+  def insert(self, body: Polygon):
+    leaf = TreeNode(grow(body.get_aabb_global(), TOUCH_MARGIN + self.fat_margin), body)
+    self.leaves[body] = leaf
+    self.insert_leaf(leaf)
+
+  def remove(self, body: Polygon):
+    self.remove_leaf(self.leaves.pop(body))
+
+  def update(self, body: Polygon) -> bool:
+    """
+      reinsert the body if it moved out of its fattened box \n
+      returns true if it was reinserted
+    """
+    leaf = self.leaves[body]
+    box = body.get_aabb_global()
+    # fattened boxes always contain the box grown by TOUCH_MARGIN, so touch queries are covered too
+    if contains(leaf.box, grow(box, TOUCH_MARGIN)):
+      return False
+    self.remove_leaf(leaf)
+    leaf.box = grow(box, TOUCH_MARGIN + self.fat_margin)
+    self.insert_leaf(leaf)
+    return True
+
+  def insert_leaf(self, leaf: TreeNode):
+    if self.root is None:
+      self.root = leaf
+      leaf.parent = None
+      return
+
+    # find the best sibling, the one which increases the total perimeter the least
+    box = leaf.box
+    node = self.root
+    while not node.is_leaf():
+      left = cast(TreeNode, node.left)
+      right = cast(TreeNode, node.right)
+      combined = perimeter(union(node.box, box))
+      cost = 2 * combined
+      # cost of pushing the leaf further down the tree
+      inheritance = 2 * (combined - perimeter(node.box))
+      cost_left = perimeter(union(box, left.box)) + inheritance
+      if not left.is_leaf():
+        cost_left -= perimeter(left.box)
+      cost_right = perimeter(union(box, right.box)) + inheritance
+      if not right.is_leaf():
+        cost_right -= perimeter(right.box)
+
+      if cost < cost_left and cost < cost_right:
+        break
+      node = left if cost_left < cost_right else right
+
+    sibling = node
+    old_parent = sibling.parent
+    new_parent = TreeNode(union(box, sibling.box))
+    new_parent.parent = old_parent
+    new_parent.height = sibling.height + 1
+    self.replace_child(old_parent, sibling, new_parent)
+    new_parent.left = sibling
+    new_parent.right = leaf
+    sibling.parent = new_parent
+    leaf.parent = new_parent
+    self.refit(new_parent)
+
+  def remove_leaf(self, leaf: TreeNode):
+    if leaf is self.root:
+      self.root = None
+      return
+    parent = cast(TreeNode, leaf.parent)
+    grandparent = parent.parent
+    sibling = cast(TreeNode, parent.right if parent.left is leaf else parent.left)
+    self.replace_child(grandparent, parent, sibling)
+    sibling.parent = grandparent
+    leaf.parent = None
+    if grandparent:
+      self.refit(grandparent)
+
+  def replace_child(self, parent: TreeNode | None, old: TreeNode, new: TreeNode):
+    if parent is None:
+      self.root = new
+    elif parent.left is old:
+      parent.left = new
+    else:
+      parent.right = new
+
+  def refit(self, node: TreeNode | None):
+    """
+      walk up from node, fixing boxes and heights, and rebalancing
+    """
+    while node:
+      node = self.balance(node)
+      left = cast(TreeNode, node.left)
+      right = cast(TreeNode, node.right)
+      node.height = 1 + max(left.height, right.height)
+      node.box = union(left.box, right.box)
+      node = node.parent
+
+  def balance(self, a: TreeNode) -> TreeNode:
+    """
+      if a is unbalanced, rotate its taller child up \n
+      returns the node now in a's position
+    """
+    if a.is_leaf() or a.height < 2:
+      return a
+    b = cast(TreeNode, a.left)
+    c = cast(TreeNode, a.right)
+    diff = c.height - b.height
+
+    if diff > 1:
+      # rotate c up
+      f = cast(TreeNode, c.left)
+      g = cast(TreeNode, c.right)
+      c.left = a
+      c.parent = a.parent
+      a.parent = c
+      self.replace_child(c.parent, a, c)
+      if f.height > g.height:
+        c.right = f
+        a.right = g
+        g.parent = a
+        a.box = union(b.box, g.box)
+        c.box = union(a.box, f.box)
+        a.height = 1 + max(b.height, g.height)
+        c.height = 1 + max(a.height, f.height)
+      else:
+        c.right = g
+        a.right = f
+        f.parent = a
+        a.box = union(b.box, f.box)
+        c.box = union(a.box, g.box)
+        a.height = 1 + max(b.height, f.height)
+        c.height = 1 + max(a.height, g.height)
+      return c
+
+    if diff < -1:
+      # rotate b up
+      d = cast(TreeNode, b.left)
+      e = cast(TreeNode, b.right)
+      b.left = a
+      b.parent = a.parent
+      a.parent = b
+      self.replace_child(b.parent, a, b)
+      if d.height > e.height:
+        b.right = d
+        a.left = e
+        e.parent = a
+        a.box = union(c.box, e.box)
+        b.box = union(a.box, d.box)
+        a.height = 1 + max(c.height, e.height)
+        b.height = 1 + max(a.height, d.height)
+      else:
+        b.right = e
+        a.left = d
+        d.parent = a
+        a.box = union(c.box, d.box)
+        b.box = union(a.box, e.box)
+        a.height = 1 + max(c.height, d.height)
+        b.height = 1 + max(a.height, e.height)
+      return b
+    return a
+
+  # queries
+
+  def query_leaves(self, box: AABB) -> list[Polygon]:
+    """
+      bodies whose fattened box overlaps 'box'
+    """
+    res: list[Polygon] = []
+    stack = [self.root] if self.root else []
+    while stack:
+      node = stack.pop()
+      if not aabb_overlap(node.box, box):
+        continue
+      if node.is_leaf():
+        res.append(cast(Polygon, node.body))
+      else:
+        stack.append(cast(TreeNode, node.left))
+        stack.append(cast(TreeNode, node.right))
+    return res
+
+  def query_region(self, box: AABB) -> list[Polygon]:
+    """
+      bodies whose bounding box overlaps the region (x_min, y_min, x_max, y_max), world coordinates
+    """
+    return [b for b in self.query_leaves(box) if aabb_overlap(b.get_aabb_global(), box)]
+
+  def query_point(self, point: Vector2) -> list[Polygon]:
+    """
+      bodies whose bounding box contains the point, world coordinates
+    """
+    return self.query_region((point.x, point.y, point.x, point.y))
+
+  # broadphase
+
+  def sync(self, bodies: list[Polygon]) -> list[Polygon]:
+    """
+      insert new bodies and remove bodies which are no longer in the engine \n
+      returns the inserted bodies
+    """
+    if len(bodies) == len(self.leaves) and all(b in self.leaves for b in bodies):
+      return []
+    members = set(bodies)
+    for b in [b for b in self.leaves if b not in members]:
+      self.remove(b)
+      self.drop_neighbours(b)
+    inserted = [b for b in bodies if b not in self.leaves]
+    for b in inserted:
+      self.insert(b)
+    return inserted
+
+  def drop_neighbours(self, body: Polygon):
+    for other in self.neighbours.pop(body, set()):
+      self.neighbours[other].discard(body)
+
+  def get_pairs(self, bodies: list[Polygon], margin: float = 0) -> list[Pair]:
+    inserted = self.sync(bodies)
+    skip = set(inserted)
+    moved = inserted + [b for b in bodies if b not in skip and self.update(b)]
+
+    for b in moved:
+      self.drop_neighbours(b)
+    for b in moved:
+      self.neighbours.setdefault(b, set())
+      for other in self.query_leaves(self.leaves[b].box):
+        if other is not b:
+          self.neighbours[b].add(other)
+          self.neighbours.setdefault(other, set()).add(b)
+
+    position = {b: i for i, b in enumerate(bodies)}
+    if margin > TOUCH_MARGIN:
+      # fattened boxes don't cover this margin, search the tree directly
+      pairs: list[Pair] = []
+      for b in bodies:
+        for other in self.query_leaves(grow(b.get_aabb_global(), 2 * margin)):
+          if position[b] < position[other]:
+            pairs.append((b, other))
+      return pairs
+    return [(b, other) for b in bodies for other in self.neighbours[b] if position[b] < position[other]]
@@ -1,44 +1,115 @@
-import pygame
 from pygame.math import Vector2
-from pygame import Rect, Surface
+from pygame import Rect
 from abc import ABC, abstractmethod
+from typing import cast
+from body_store import BodyStore
 from collections.abc import Iterable
-from common import avg
-from common import draw_arrow, label
-from constants import DELTA, DELTA_THETA, GRAVITY, RESTING_CONTACT_THRES
+from config import PhysicsConfig
+from constants import DELTA, DELTA_THETA, REST_ANGULAR_SPEED, REST_SPEED
 from helper import *
 import math
-
-from ui_lib2 import AlphaColor, lighten
+import time
+import numpy as np
 
 class RigidBody(ABC):
-  def __init__(self):
+  """
+    the physical state lives in a row of a BodyStore, the attributes below read and write that row \n
+    the Vector2 attributes return a copy of the row, so changing the copy in place changes nothing:
+    b.linear_velocity.x += 1 is lost, assign a whole vector instead (b.linear_velocity += Vector2(1, 0)) \n
+    index is -1 once the body is removed from its world, its row may then belong to another body
+  """
+  def __init__(self, store: BodyStore | None = None):
     super().__init__()
-    self.mass: float = 0
-    self.linear_velocity: Vector2 = Vector2(0, 0)
-    self.linear_acceleration: Vector2 = Vector2(0, 0)
-
-    self.rotational_inertia: float = 0
-    self.rotational_acceleration: float = 0
-    self.rotational_displacement: float = 0
-    self.rotational_velocity: float = 0
+    # a body created on its own gets its own store
+    self.store = store if store else BodyStore(1)
+    self.index = self.store.allocate()
+
+  @property
+  def mass(self) -> float:
+    return self.store.mass.item(self.index)
+
+  @mass.setter
+  def mass(self, val: float):
+    self.store.mass[self.index] = val
+    self.store.inv_mass[self.index] = 1 / val if val > 0 else 0
+
+  @property
+  def rotational_inertia(self) -> float:
+    return self.store.inertia.item(self.index)
+
+  @rotational_inertia.setter
+  def rotational_inertia(self, val: float):
+    self.store.inertia[self.index] = val
+    self.store.inv_inertia[self.index] = 1 / val if val > 0 else 0
+
+  @property
+  def center_of_mass(self) -> Vector2:
+    return Vector2(self.store.pos[self.index].tolist())
+
+  @center_of_mass.setter
+  def center_of_mass(self, val: Vector2):
+    self.store.pos[self.index] = (val.x, val.y)
+
+  @property
+  def linear_velocity(self) -> Vector2:
+    return Vector2(self.store.vel[self.index].tolist())
+
+  @linear_velocity.setter
+  def linear_velocity(self, val: Vector2):
+    self.store.vel[self.index] = (val.x, val.y)
+
+  @property
+  def linear_acceleration(self) -> Vector2:
+    return Vector2(self.store.acc[self.index].tolist())
+
+  @linear_acceleration.setter
+  def linear_acceleration(self, val: Vector2):
+    self.store.acc[self.index] = (val.x, val.y)
+
+  @property
+  def rotational_displacement(self) -> float:
+    return self.store.rot.item(self.index)
+
+  @rotational_displacement.setter
+  def rotational_displacement(self, val: float):
+    self.store.rot[self.index] = val
+
+  @property
+  def rotational_velocity(self) -> float:
+    return self.store.ang_vel.item(self.index)
+
+  @rotational_velocity.setter
+  def rotational_velocity(self, val: float):
+    self.store.ang_vel[self.index] = val
+
+  @property
+  def rotational_acceleration(self) -> float:
+    return self.store.ang_acc.item(self.index)
+
+  @rotational_acceleration.setter
+  def rotational_acceleration(self, val: float):
+    self.store.ang_acc[self.index] = val
     
   @abstractmethod
   def update_unconstrained(self, dt: float) -> None:
     pass
 
-def negligible_difference(com1: Vector2 | None, com2: Vector2 | None, rot_dis_1: float | None, rot_dis_2: float | None):
+def negligible_difference(com1: Vector2 | None, com2: Vector2 | None, rot_dis_1: float | None, rot_dis_2: float | None, delta: float = DELTA, delta_theta: float = DELTA_THETA):
   if com1 == None or com2 == None or rot_dis_1 == None or rot_dis_2 == None:
     return True # first frame, return true
-  return Vector2.magnitude_squared(com1 - com2) <= DELTA and min(abs(rot_dis_1 - rot_dis_2), 2*math.pi - abs(rot_dis_1 - rot_dis_2)) <= DELTA_THETA
+  return Vector2.magnitude_squared(com1 - com2) <= delta and min(abs(rot_dis_1 - rot_dis_2), 2*math.pi - abs(rot_dis_1 - rot_dis_2)) <= delta_theta
 
-def might_be_stationary(b: 'Polygon'):
-  return negligible_difference(b.center_of_mass, b.prev_center_of_mass, b.rotational_displacement, b.prev_rotational_displacement) \
-       and negligible_difference(b.center_of_mass, b.begin_pos, b.rotational_displacement, b.begin_rot)
+def might_be_stationary(b: 'Polygon', dt: float, speed: float = REST_SPEED, angular_speed: float = REST_ANGULAR_SPEED, delta: float = DELTA, delta_theta: float = DELTA_THETA):
+  """
+    b moved at most speed * dt (angular_speed * dt) in the last step,
+    and drifted at most sqrt(delta) (delta_theta) since it began barely moving
+  """
+  return negligible_difference(b.center_of_mass, b.prev_center_of_mass, b.rotational_displacement, b.prev_rotational_displacement, (speed * dt)**2, angular_speed * dt) \
+       and negligible_difference(b.center_of_mass, b.begin_pos, b.rotational_displacement, b.begin_rot, delta, delta_theta)
 
 class Polygon(RigidBody):
-  def __init__(self, points: Iterable[Vector2], body_id: int, immovable: bool = False):
-    super().__init__()
+  def __init__(self, points: Iterable[Vector2], body_id: int, immovable: bool = False, store: BodyStore | None = None):
+    super().__init__(store)
     self.body_id = body_id
     self.area = area_of_polygon(list(points))
     self.mass = area_of_polygon(list(points)) if not immovable else -1
@@ -47,7 +118,17 @@ class Polygon(RigidBody):
     # - center
     # - points relative to center
     self.center_of_mass: Vector2 = center_of_mass(list(points))
-    self.points_local: list[Vector2] = list(map(lambda p: p - self.center_of_mass, points))
+    self.store.save_previous(self.index)
+    self.set_shape(list(map(lambda p: p - self.center_of_mass, points)))
+
+    # world space cache, see update_transform_cache
+    self.cached_transform: tuple[float, float, float] | None = None
+    self.cached_rotation: float | None = None
+    self.rotation_cos = 1.0
+    self.rotation_sin = 0.0
+    self.points_global: list[Vector2] = []
+    self.normals_global: list[Vector2] = []
+    self.aabb_global: tuple[float, float, float, float] = (0, 0, 0, 0)
     
     # for resting contacts
     self.prev_center_of_mass: Vector2 | None = None
@@ -57,9 +138,8 @@ class Polygon(RigidBody):
     self.begin_rot = self.rotational_displacement
     self.might_be_resting = False
     self.resting = immovable
-    
-    self.touching: set[Polygon] = set()
-    # self.touching_prev: set[int] = set()
+    # whole island is asleep, the engine skips this body entirely
+    self.sleeping = False
     
     
     # for drawing
@@ -71,30 +151,70 @@ class Polygon(RigidBody):
     # for on drag state
     self.is_being_dragged = False
 
-  def draw(self, screen: Surface):
-    screen_points = world_to_screen(self.get_points_global())
-    mid = avg(screen_points)
-    pygame.draw.polygon(screen, self.fill_color, screen_points)
-    lab = label(str(self.body_id), 'Arial', 10)
-    rect = pygame.Rect((0, 0), (lab.get_width(), lab.get_height()))
-    rect.center = (int(mid.x), int(mid.y))
-    screen.blit(lab, rect)
-    if self.border_thickness > 0:
-      pygame.draw.polygon(screen, self.border_color, screen_points, self.border_thickness)
-    
-    if self.draw_vel_vector:
-      draw_arrow(self.center_of_mass, self.center_of_mass + self.linear_velocity, screen)
-    
-    
+  def set_shape(self, points_local: list[Vector2]):
+    """
+      points relative to the center of mass, and everything derived from them
+    """
+    self.points_local = points_local
+    # body space edge normals, see separating_axes
+    self.normals_local, self.axes = separating_axes(self.points_local)
+    # same shape as arrays, for the batched narrowphase
+    self.points_local_array = np.array([(p.x, p.y) for p in self.points_local])
+    self.normals_local_array = np.array([(n.x, n.y) for n in self.normals_local])
+    self.axes_array = np.array(self.axes)
+    self.cached_transform = None
+
+  def get_points_interpolated(self, alpha: float) -> list[Vector2]:
+    """
+      world space points at alpha of the way from the previous transform (alpha = 0) to the current one (alpha = 1)
+    """
+    prev = Vector2(self.store.prev_pos[self.index].tolist())
+    com = prev.lerp(self.center_of_mass, alpha)
+    prev_rot = self.store.prev_rot.item(self.index)
+    # rotations are kept in [0, 2pi), turn the short way round
+    d_rot = (self.rotational_displacement - prev_rot + math.pi) % (2*math.pi) - math.pi
+    rot = prev_rot + alpha * d_rot
+    c, s = math.cos(rot), math.sin(rot)
+    return [Vector2(c*p.x - s*p.y + com.x, s*p.x + c*p.y + com.y) for p in self.points_local]
+
+  def update_transform_cache(self):
+    """
+      recompute the world space points, normals, bounding box and sin / cos of the rotation \n
+      does nothing unless center_of_mass or rotational_displacement changed since the last call
+    """
+    # straight from the store, this runs for every body in every pair
+    x, y = self.store.pos[self.index].tolist()
+    rot = self.store.rot.item(self.index)
+    transform = (x, y, rot)
+    if transform == self.cached_transform:
+      return
+    if rot != self.cached_rotation:
+      self.rotation_cos = math.cos(rot)
+      self.rotation_sin = math.sin(rot)
+      self.cached_rotation = rot
+      c = self.rotation_cos
+      s = self.rotation_sin
+      self.normals_global = [Vector2(c*n.x - s*n.y, s*n.x + c*n.y) for n in self.normals_local]
+    c = self.rotation_cos
+    s = self.rotation_sin
+    # new Vector2s every time, collusion data may still hold on to the old ones
+    self.points_global = [Vector2(c*p.x - s*p.y + x, s*p.x + c*p.y + y) for p in self.points_local]
+    xs = [p.x for p in self.points_global]
+    ys = [p.y for p in self.points_global]
+    self.aabb_global = (min(xs), min(ys), max(xs), max(ys))
+    self.cached_transform = transform
+
+  def get_aabb_global(self) -> tuple[float, float, float, float]:
+    """
+      (x_min, y_min, x_max, y_max) of the body in world coordinates \n
+      unlike get_bounding_box_global, this is not rounded to integers
+    """
+    self.update_transform_cache()
+    return self.aabb_global
 
   def get_bounding_box_global(self):
-    global_points = self.get_points_global()
-    x_min = min(map(lambda p : p.x, global_points))
-    y_min = min(map(lambda p : p.y, global_points))
+    x_min, y_min, x_max, y_max = self.get_aabb_global()
     left_top = Vector2(x_min, y_min)
-    
-    x_max = max(map(lambda p : p.x, global_points))
-    y_max = max(map(lambda p : p.y, global_points))
     width_height = Vector2(x_max - x_min, y_max - y_min)
     
     return Rect(left_top, width_height)
@@ -104,11 +224,23 @@ class Polygon(RigidBody):
       ensure normal is normalized before passing in here
     """
     global_points = self.get_points_global()
-    dists = list(map(lambda p: Vector2.dot(normal, p) , global_points))
+    dists = [normal.dot(p) for p in global_points]
     return (min(dists), max(dists))
   
+  def get_normals_global(self):
+    """
+      world space normals, one for each of self.axes \n
+      cached, don't modify the returned list
+    """
+    self.update_transform_cache()
+    return self.normals_global
+
   def get_points_global(self):
-    return list(map(lambda p: p.rotate_rad(self.rotational_displacement) + self.center_of_mass, self.points_local))
+    """
+      cached, don't modify the returned list
+    """
+    self.update_transform_cache()
+    return self.points_global
 
   def stop_resting(self):
     if not self.resting:
@@ -122,19 +254,23 @@ class Polygon(RigidBody):
     self.begin_rot = self.rotational_displacement
     self.current_run = 0
 
-  def update_rest(self):
+  def update_rest(self, touching: Iterable['Polygon'], resting_steps: int):
+    """
+      touching: bodies close enough to this one to hold it up, or knock it over \n
+      resting_steps: steps the body must barely move before it rests
+    """
     if self.mass < 0:
       return
     # current body might be stationary
     # all bodies this body touches also might be stationary (confirmed not moving)
-    if self.might_be_resting and len([b for b in self.touching if (not b.might_be_resting)]) == 0:
-      self.current_run = min(self.current_run + 1, RESTING_CONTACT_THRES)
+    if self.might_be_resting and len([b for b in touching if (not b.might_be_resting)]) == 0:
+      self.current_run = min(self.current_run + 1, resting_steps)
     else:
       self.resting = False
       self.current_run = 0
       self.begin_pos = Vector2(self.center_of_mass)
 
-    if self.current_run >= RESTING_CONTACT_THRES:
+    if self.current_run >= resting_steps:
       self.current_run = 0
       self.resting = True
       self.linear_velocity = Vector2(0, 0)
@@ -153,12 +289,13 @@ class Polygon(RigidBody):
       return
 
     # forces will update the acceleration
-    self.center_of_mass += self.linear_velocity * dt + (1/2) * dt * dt * self.linear_acceleration
-    self.linear_velocity += self.linear_acceleration
+    # semi-implicit euler, same as BodyStore.integrate
+    self.linear_velocity += self.linear_acceleration * dt
+    self.center_of_mass += self.linear_velocity * dt
     
-    self.rotational_displacement += self.rotational_velocity * dt + (1/2) * dt * dt * self.rotational_acceleration
+    self.rotational_velocity += self.rotational_acceleration * dt
+    self.rotational_displacement += self.rotational_velocity * dt
     self.rotational_displacement %= (2*math.pi)
-    self.rotational_velocity += self.rotational_acceleration
     
   def apply_force(self, contact_point_world: Vector2, force_vector: Vector2) -> None:
     """
@@ -189,29 +326,107 @@ class ForceGenerator:
   def apply_forces(self) -> None:
     pass
 
+  @classmethod
+  def apply_batch(cls, generators: list['ForceGenerator'], store: BodyStore, active: np.ndarray, cache: dict, timings: dict['ForceGenerator', float]) -> None:
+    """
+      apply every generator of this kind, used by ForceRegistry \n
+      active: for each row of store, true if its body is simulated this step \n
+      cache: kept between steps for this kind, emptied when generators are added or removed \n
+      timings: seconds spent on each generator are written here \n
+      kinds with many generators override this to apply them all in one go
+    """
+    for g in generators:
+      start = time.perf_counter()
+      g.apply_forces()
+      timings[g] = time.perf_counter() - start
+
 class ConstantForceGenerator(ForceGenerator):
+  # changes whenever the target or force of any generator is set, so apply_batch builds its arrays again
+  version = 0
+
   def __init__(self, target: Polygon, force_vector: Vector2) -> None:
     """
-      generate a constant force on a body attatched to center of mass
+      generate a constant force on a body attatched to center of mass \n
+      force_vector is copied in and out like the vectors of RigidBody, assign it to change the force
     """
     super().__init__()
     self.target = target
     self.force_vector = force_vector
+
+  @property
+  def target(self) -> Polygon:
+    return self._target
+
+  @target.setter
+  def target(self, val: Polygon):
+    self._target = val
+    ConstantForceGenerator.version += 1
+
+  @property
+  def force_vector(self) -> Vector2:
+    return Vector2(self._force_vector)
+
+  @force_vector.setter
+  def force_vector(self, val: Vector2):
+    self._force_vector = Vector2(val)
+    ConstantForceGenerator.version += 1
   
   def apply_forces(self) -> None:
     self.target.apply_force(self.target.center_of_mass, self.force_vector)
+
+  @classmethod
+  def apply_batch(cls, generators: list['ForceGenerator'], store: BodyStore, active: np.ndarray, cache: dict, timings: dict['ForceGenerator', float]) -> None:
+    """
+      the rows and forces are kept in cache until a generator changes, or the bodies get other rows \n
+      all of them are applied at once, so each generator is timed as an even share of the whole
+    """
+    start = time.perf_counter()
+    gens = cast(list[ConstantForceGenerator], generators)
+    key = (id(store), store.layout, ConstantForceGenerator.version)
+    if cache.get('key') != key:
+      # removed bodies have no row
+      targeted = [g for g in gens if g.target.index >= 0]
+      cache['key'] = key
+      cache['rows'] = np.array([g.target.index for g in targeted], dtype=int)
+      cache['forces'] = np.array([(g._force_vector.x, g._force_vector.y) for g in targeted]).reshape(-1, 2)
+    rows: np.ndarray = cache['rows']
+    forces: np.ndarray = cache['forces']
+    keep = active[rows] & (store.mass[rows] > 0)
+    rows, forces = rows[keep], forces[keep]
+    # at the center of mass, so no torque. add.at, as a body can have several generators
+    np.add.at(store.acc, rows, forces * store.inv_mass[rows, None])
+    share = (time.perf_counter() - start) / len(gens)
+    for g in gens:
+      timings[g] = share
   
 
 class GravityForceGenerator(ForceGenerator):
-  def __init__(self, world_bodies: list[Polygon]) -> None:
+  def __init__(self, world_bodies: list[Polygon], config: PhysicsConfig | None = None) -> None:
     """
-      applies 'GRAVITY' to all objects
+      applies the gravity of 'config' to all objects, read when applied, so changing config.gravity takes effect on the next step
     """
     self.world_bodies = world_bodies
+    self.config = config if config else PhysicsConfig()
+
+  @property
+  def gravity(self) -> float:
+    return self.config.gravity
+
+  @gravity.setter
+  def gravity(self, val: float):
+    self.config.gravity = val
   
   def apply_forces(self):
     for body in self.world_bodies:
-      body.apply_force(body.center_of_mass, Vector2(0, -GRAVITY))
+      body.apply_force(body.center_of_mass, Vector2(0, -self.gravity * body.mass))
+
+  @classmethod
+  def apply_batch(cls, generators: list['ForceGenerator'], store: BodyStore, active: np.ndarray, cache: dict, timings: dict['ForceGenerator', float]) -> None:
+    for g in cast(list[GravityForceGenerator], generators):
+      start = time.perf_counter()
+      rows = store.rows(g.world_bodies)
+      store.apply_gravity(rows[active[rows]], g.gravity)
+      timings[g] = time.perf_counter() - start
       
 class PullForceGenerator(ForceGenerator):
   def __init__(self, target: Polygon, contact_point_world: Vector2, destination: Vector2) -> None:
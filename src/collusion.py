@@ -1,8 +1,8 @@
 from dataclasses import dataclass
 from pygame import Rect
 from pygame.math import Vector2
-from common import avg
-from constants import COE
+from constants import COE, GJK_VERTEX_THRESHOLD
+from gjk import epa, gjk
 from helper import *
 from classes import Polygon
 
@@ -13,6 +13,9 @@ class CollusionData:
   penetration_depth: float
   contact_points: list[Vector2]
   collusion_normal: Vector2 # this points towards objA
+  # (lower body_id, its edge in the contact, higher body_id), identifies the contact between steps,
+  # whichever body gives the reference edge. The contact points are in order along that edge, so a point keeps its index too
+  feature_key: tuple[int, int, int] | None = None
   
   def __str__(self) -> str:
     res = ""
@@ -20,16 +23,118 @@ class CollusionData:
       res += f"{at}: {str(self.__dict__[at])}\n"
     return res
       
+# in touch mode, collide accepts separations down to this depth
+TOUCH_THRES = -5
+# how much each bounding box must be grown so a broadphase finds every pair collide(..., touch=True) can accept
+# (adjust_rect grows the box by 1 - TOUCH_THRES, plus 1 for the integer rounding of Rect)
+TOUCH_MARGIN = 2 - TOUCH_THRES
+
 def range_depth(r1: tuple[float, float], r2: tuple[float, float]):
   if r1[0] > r2[0]:
     r1, r2 = r2, r1
   return r1[1] - r2[0]
   
 
-def collide(b1: Polygon, b2: Polygon, touch: bool = False) -> CollusionData | None:
+def contact_data(ref: Polygon, inc: Polygon, edge: int, normal: Vector2, depth: float, w_idx: int) -> CollusionData:
+  """
+    build the collusion data once the separating axis test found the minimum penetration \n
+    ref: polygon owning the reference edge 'edge', with outward normal 'normal' \n
+    inc: the other polygon, w_idx is its vertex furthest along -normal
+  """
+  # resolving interpenetration
+  # - move b1 in direction 'n' a distance of m2/(m1 + m2)
+  # - move b2 in direction 'n' a distance of m1/(m1 + m2)
+  
+  # for normal in minimum direction
+  #   A = polygon
+  #   B = not polygon
+  #   find v, point in B which is furthest along normal
+  #   find v0 -> v,  v1 -> v, and decide which one is more perpendicular to n (say its v0 -> v)
+  #   this is the incident edge
+  #   clip v0 -> v along normal
+  points_ref = ref.get_points_global()
+  points_inc = inc.get_points_global()
+  v0 = points_ref[edge]
+  v1 = points_ref[(edge + 1) % len(points_ref)]
+  # (v0, v1) is the reference edge
+  direction = (v1 - v0).normalize()
+  
+  w = points_inc[w_idx]
+  w0 = points_inc[(w_idx - 1) % len(points_inc)]
+  w1 = points_inc[(w_idx + 1) % len(points_inc)]
+  # w0 -> w
+  # w1 -> w
+  # see which is more perpendicular to the normal
+  # let this be incident edge
+  incident = (w0, w) if abs(Vector2.dot(normal, w - w0)) <= abs(Vector2.dot(normal, w - w1)) else (w1, w)
+  # index of the incident edge, edge i goes from point i to point i + 1
+  inc_edge = (w_idx - 1) % len(points_inc) if incident[0] is w0 else w_idx
+  
+  # w0, w1 is the incident edge
+  (w0, w1) = incident
+  collusion_points = clip([w0, w1], direction, Vector2.dot(direction, v0)) # may return none
+  collusion_points = clip(collusion_points, -direction, Vector2.dot(-direction, v1))
+  collusion_points = clip(collusion_points, -normal, Vector2.dot(-normal, v0))
+  # the key is made from the body with the lower id, so is the order of the points
+  # (the incident edge runs the opposite way to the reference edge)
+  if ref.body_id < inc.body_id:
+    key = (ref.body_id, edge, inc.body_id)
+    collusion_points.sort(key=lambda p: Vector2.dot(direction, p))
+  else:
+    key = (inc.body_id, inc_edge, ref.body_id)
+    collusion_points.sort(key=lambda p: -Vector2.dot(direction, p))
+  
+  # objA is object receiving hit. This is the object on the right
+  # a normal is only a candidate when the reference polygon starts to the left of the other one
+  # along it, so the incident polygon is always the one on the right
+  return CollusionData(
+    objA = inc,
+    objB = ref,
+    collusion_normal = normal, # need it to point towards bodyA by convention
+    contact_points = collusion_points,
+    penetration_depth = depth,
+    feature_key = key,
+  )
+
+class SeparatingAxisCache:
+  """
+    remembers which axis separated a pair the last time collide returned none for it \n
+    pairs tend to stay separated along the same axis, so collide tries that axis first \n
+    entries not used for a whole step are dropped at end_step
+  """
+  def __init__(self) -> None:
+    # (body_id 1, body_id 2, touch) -> (polygon (0 or 1), axis index)
+    self.axes: dict[tuple[int, int, bool], tuple[int, int]] = {}
+    self.current: dict[tuple[int, int, bool], tuple[int, int]] = {}
+
+  def get(self, key: tuple[int, int, bool]) -> tuple[int, int] | None:
+    axis = self.current.get(key)
+    return axis if axis else self.axes.get(key)
+
+  def store(self, key: tuple[int, int, bool], axis: tuple[int, int]):
+    self.current[key] = axis
+
+  def forget(self, key: tuple[int, int, bool]):
+    self.current.pop(key, None)
+    self.axes.pop(key, None)
+
+  def end_step(self):
+    self.axes = self.current
+    self.current = {}
+
+def separated_along(b1: Polygon, b2: Polygon, normal: Vector2, touch: bool) -> bool:
+  """
+    true if 'normal' is a separating axis for the two polygons
+  """
+  abs_depth = range_depth(b1.project_onto_normal(normal), b2.project_onto_normal(normal))
+  return abs_depth < TOUCH_THRES if touch else abs_depth <= 0
+
+def collide(b1: Polygon, b2: Polygon, touch: bool = False, axis_cache: SeparatingAxisCache | None = None) -> CollusionData | None:
   """
     get collusion data for two objects. Returns none if not colliding
     touch: adds a leeway instead of checking for strict collusions
+    axis_cache: if given, the axis which separated this pair last time is tested first
+    pairs with more than GJK_VERTEX_THRESHOLD vertices in total use collide_gjk instead of testing every axis
   """
   
   def adjust_rect(rect: Rect, thres: int):
@@ -39,7 +144,7 @@ def collide(b1: Polygon, b2: Polygon, touch: bool = False) -> CollusionData | No
     thres -= 1
     return Rect((rect.topleft[0] + thres, rect.topleft[1] + thres), (rect.width - 2*thres, rect.height - 2*thres))
   
-  THRES = -5
+  THRES = TOUCH_THRES
   r1 = b1.get_bounding_box_global()
   r2 = b2.get_bounding_box_global()
   if touch:
@@ -49,27 +154,31 @@ def collide(b1: Polygon, b2: Polygon, touch: bool = False) -> CollusionData | No
   if r1.colliderect(r2):
     points1 = b1.get_points_global()
     points2 = b2.get_points_global()
-    L1 = len(points1)
-    L2 = len(points2)
     
     polygons = [b1, b2]
+    cache_key = (b1.body_id, b2.body_id, touch)
+    if axis_cache:
+      hint = axis_cache.get(cache_key)
+      if hint:
+        (p, k) = hint
+        normals = polygons[p].get_normals_global()
+        if k < len(normals) and separated_along(polygons[p], polygons[1 - p], normals[k], touch):
+          axis_cache.store(cache_key, hint)
+          return None
+    if len(points1) + len(points2) > GJK_VERTEX_THRESHOLD:
+      return collide_gjk(b1, b2, touch)
     points = [points1, points2]
     # get the smallest penetration depth, and normal which gives this
-    # normal: (n, polygon (0 or 1)), so we know which polygon the normal is from
-    # normal[polgon][index]
-    normals = [[Vector2(-1, -1) for _ in range(L1)], [Vector2(-1, -1) for _ in range(L2)]]
-    for i in range(L1):
-      normal = rot_90_c(points1[(i + 1) % L1] - points1[i]).normalize()
-      normals[0][i] = normal
-    for i in range(L2):
-      normal = rot_90_c(points2[(i + 1) % L2] - points2[i]).normalize()
-      normals[1][i] = normal
-    
+    # min_i: (polygon (0 or 1), edge index), so we know which polygon the normal is from
+    # parallel edges share an axis, so both edges of an axis are checked from one pair of projections
     min_i = (-1, -1)
     min_d = 1E15
+    min_normal = Vector2(0, 0)
     for p in range(2):
-      for i in range(len(normals[p])):
-        normal = normals[p][i]
+      normals = polygons[p].get_normals_global()
+      for k in range(len(normals)):
+        normal = normals[k]
+        (edge, opposite) = polygons[p].axes[k]
         range1 = polygons[p].project_onto_normal(normal)
         range2 = polygons[1 - p].project_onto_normal(normal)
         
@@ -77,89 +186,93 @@ def collide(b1: Polygon, b2: Polygon, touch: bool = False) -> CollusionData | No
         abs_depth = range_depth(range1, range2)
         
         # need abs_depth >= thres
-        if touch:
-          if abs_depth < THRES:
-            # found a separating axis
-            return None
-        else:
-          if abs_depth <= 0:
-            return None
+        if (touch and abs_depth < THRES) or (not touch and abs_depth <= 0):
+          # found a separating axis
+          if axis_cache:
+            axis_cache.store(cache_key, (p, k))
+          return None
         # - collusion normals are defined by a point and a direction
         # - we need range1 to be to the left of range2, otherwise this normal is invalid
         # - otherwise, this is not a valid collusion normal
-        if range1[0] >= range2[0]:
-          continue
-        
-        normal_depth = range1[1] - range2[0]
-        if normal_depth < min_d:
-          min_d = normal_depth
-          min_i = (p, i)
-    # resolving interpenetration
-    # - move b1 in direction 'n' a distance of m2/(m1 + m2)
-    # - move b2 in direction 'n' a distance of m1/(m1 + m2)
-    
-    # for normal in minimum direction
-    #   A = polygon
-    #   B = not polygon
-    #   find v, point in B which is furthest along normal
-    #   find v0 -> v,  v1 -> v, and decide which one is more perpendicular to n (say its v0 -> v)
-    #   this is the incident edge
-    #   clip v0 -> v along normal
-    # print(min_i)
-
+        if range1[0] < range2[0]:
+          normal_depth = range1[1] - range2[0]
+          if normal_depth < min_d:
+            min_d = normal_depth
+            min_i = (p, edge)
+            min_normal = normal
+        # the opposite edge has normal -normal, so the ranges are mirrored
+        if opposite >= 0 and range1[1] > range2[1]:
+          normal_depth = range2[1] - range1[0]
+          if normal_depth < min_d:
+            min_d = normal_depth
+            min_i = (p, opposite)
+            min_normal = -normal
+    if axis_cache:
+      axis_cache.forget(cache_key)
+    if min_i[0] < 0:
+      # no axis gives a valid normal (eg. the polygons coincide), so there is no way to push them apart
+      return None
     (polyA, i) = min_i
-
-    normal = normals[polyA][i]
-    
-    v0 = points[polyA][i]
-    v1 = points[polyA][(i + 1) % len(points[polyA])]
-
-    
-    direction = (v1 - v0).normalize()
-    # (v0, v1) is the reference edge
     polyB = 1 - polyA
+    # find the point in B which is furthest along -normal (deepest into A)
     w_dist = 1E15
     w_idx = -1
-    for i in range(len(points[polyB])):
-      d = Vector2.dot(points[polyB][i], normal)
+    for j in range(len(points[polyB])):
+      d = Vector2.dot(points[polyB][j], min_normal)
       if d < w_dist:
         w_dist = d
-        w_idx = i
-    
-    w = points[polyB][w_idx]
-    w0 = points[polyB][(w_idx - 1) % len(points[polyB])]
-    w1 = points[polyB][(w_idx + 1) % len(points[polyB])]
-    # w0 -> w
-    # w1 -> w
-    # see which is more perpendicular to the normal
-    # let this be incident edge
-    incident = (w0, w) if abs(Vector2.dot(normal, w - w0)) <= abs(Vector2.dot(normal, w - w1)) else (w1, w)
-    
-    # w0, w1 is the incident edge
-    (w0, w1) = incident
-    collusion_points = clip([w0, w1], direction, Vector2.dot(direction, v0)) # may return none
-    collusion_points = clip(collusion_points, -direction, Vector2.dot(-direction, v1))
-    collusion_points = clip(collusion_points, -normal, Vector2.dot(-normal, v0))
-    
-    rangeA = polygons[polyA].project_onto_normal(normal)
-    rangeB = polygons[polyB].project_onto_normal(normal)
-    
-    # finalA is object receiving hit. This is the object on the right
-    # finalB is the opposite object
-    finalA = polyB if rangeA[0] < rangeB[0] else polyA
-    finalB = 1 - finalA
-    
-    collusion_data = CollusionData(
-      objA = polygons[finalA],
-      objB = polygons[finalB],
-      collusion_normal = normal, # need it to point towards bodyA by convention
-      contact_points = collusion_points,
-      penetration_depth = min_d,
-    )
-    return collusion_data
+        w_idx = j
+    return contact_data(polygons[polyA], polygons[polyB], i, min_normal, min_d, w_idx)
   else:
     return None
 
+def collide_gjk(b1: Polygon, b2: Polygon, touch: bool = False) -> CollusionData | None:
+  """
+    same as collide, but the normal is found with GJK / EPA instead of testing every axis \n
+    each GJK / EPA iteration is O(V1 + V2), instead of O((V1 + V2)^2) for the separating axis test \n
+    touch: polygons closer than -TOUCH_THRES count as colliding
+  """
+  polygons = [b1, b2]
+  points1 = b1.get_points_global()
+  points2 = b2.get_points_global()
+  (intersecting, simplex, v) = gjk(points1, points2)
+  if intersecting:
+    # n points from b1 towards b2
+    (n, depth) = epa(points1, points2, simplex)
+  else:
+    dist = v.length()
+    if not touch or dist > -TOUCH_THRES:
+      return None
+    # v points from b2 to b1
+    n = -v / dist
+    depth = -dist
+  if not touch and depth <= 0:
+    return None
+
+  # the normal of A - B is an edge normal of b1 or of b2 (reversed), so use that edge as the reference edge
+  best = -2.0
+  (p, edge, normal) = (0, -1, n)
+  for (q, target) in [(0, n), (1, -n)]:
+    normals = polygons[q].get_normals_global()
+    for k in range(len(normals)):
+      (e, opposite) = polygons[q].axes[k]
+      d = normals[k].dot(target)
+      if d > best:
+        (best, p, edge, normal) = (d, q, e, normals[k])
+      if opposite >= 0 and -d > best:
+        (best, p, edge, normal) = (-d, q, opposite, -normals[k])
+
+  ref = polygons[p]
+  inc = polygons[1 - p]
+  range1 = ref.project_onto_normal(normal)
+  range2 = inc.project_onto_normal(normal)
+  depth = range1[1] - range2[0]
+  if not touch and depth <= 0:
+    return None
+  points_inc = inc.get_points_global()
+  dists = [normal.dot(q) for q in points_inc]
+  return contact_data(ref, inc, edge, normal, depth, dists.index(min(dists)))
+
 def recalculate_penetration(collusion_data: CollusionData):
   """
     without recalculating the collusion normal for the two objects involved, recalculate the penetration
@@ -222,8 +335,32 @@ def recalculate_separating_velocity(collusion_data: CollusionData):
   ans = v_ab.dot(n)
   return ans
 
-def resolve_velocity(collusion_data: CollusionData, frame_length: float):
-  
+def apply_impulse(collusion_data: CollusionData, impulse: float, p: Vector2):
+  """
+    apply 'impulse' along the collusion normal at p, pushing objA along the normal and objB against it
+  """
+  objA = collusion_data.objA
+  objB = collusion_data.objB
+  n = collusion_data.collusion_normal
+  if objA.mass > 0:
+    r_ap_perp = rot_90_ac(p - objA.center_of_mass)
+    objA.linear_velocity = objA.linear_velocity + (impulse / objA.mass) * n
+    objA.rotational_velocity = objA.rotational_velocity + (r_ap_perp.dot(impulse * n)) / objA.rotational_inertia
+  if objB.mass > 0:
+    r_bp_perp = rot_90_ac(p - objB.center_of_mass)
+    objB.linear_velocity = objB.linear_velocity + (-impulse / objB.mass) * n
+    objB.rotational_velocity = objB.rotational_velocity + (r_bp_perp.dot(-impulse * n)) / objB.rotational_inertia
+
+def resolve_velocity(collusion_data: CollusionData, frame_length: float, accumulated: float | None = None, coe: float = COE, target: float | None = None) -> float:
+  """
+    apply an impulse at the average contact point so the bodies bounce off each other \n
+    coe: coefficient of restitution \n
+    accumulated: total impulse this contact already received this step (eg. from warm starting).
+    If given, the total is clamped to stay >= 0, so the contact never pulls the bodies together \n
+    target: separating velocity to end with, instead of bouncing off with coe of the current velocity
+    (which after a warm start impulse is no longer the approach velocity) \n
+    returns the total impulse of the contact
+  """
   objA = collusion_data.objA
   objB = collusion_data.objB
   n = collusion_data.collusion_normal
@@ -254,10 +391,14 @@ def resolve_velocity(collusion_data: CollusionData, frame_length: float):
   rap_div_IA = ((r_ap_perp.dot(n) * r_ap_perp.dot(n)) / I_A) if M_A > 0 else 0
   rbp_div_IB = ((r_bp_perp.dot(n) * r_bp_perp.dot(n)) / I_B) if M_B > 0 else 0
 
-  numerator = -(1 + COE) * v_ab.dot(n)
+  numerator = -(1 + coe) * v_ab.dot(n) if target is None else target - v_ab.dot(n)
   
   denom = n.dot(n) * (invMA + invMB) + rap_div_IA + rbp_div_IB
   impulse = numerator / denom
+  total = impulse
+  if accumulated is not None:
+    total = max(accumulated + impulse, 0)
+    impulse = total - accumulated
   # don't change any velocities of the object if it has infinite mass
   # if object is moving too slowly, then we realize it is a resting contact
   # - don't affect the accelerations, so speed can still build up
@@ -266,10 +407,6 @@ def resolve_velocity(collusion_data: CollusionData, frame_length: float):
   # - need a way to remove the speed
   # - 
   
-  if M_A > 0:
-    objA.linear_velocity = v_a + (impulse / M_A) * n
-    objA.rotational_velocity = wa + (r_ap_perp.dot(impulse * n)) / I_A
-  
-  if M_B > 0:
-    objB.linear_velocity = v_b + (-impulse / M_B) * n
-    objB.rotational_velocity = wb + (r_bp_perp.dot(-impulse * n)) / I_B
+  apply_impulse(collusion_data, impulse, p)
+  return total
+
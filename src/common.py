@@ -6,7 +6,7 @@ from typing import Literal
 import pygame
 from pygame import Surface, Vector2
 
-from helper import rot_90_c, world_to_screen
+from helper import avg, rot_90_c, world_to_screen
 
 
 # game state
@@ -231,5 +231,3 @@ def draw_arrow(start: Vector2, end: Vector2, surface: pygame.Surface):
   c = o - perp
   pygame.draw.polygon(surface, (0, 0, 255), world_to_screen([a, end, c]))
   
-def avg(points: list[Vector2]):
-  return Vector2(sum(map(lambda p: p.x, points)) / len(points), sum(map(lambda p: p.y, points)) / len(points))
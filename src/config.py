@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from constants import COE, CONTACT_RESOLVER_MAX_ITERATIONS, DELTA, DELTA_THETA, GRAVITY, REST_ANGULAR_SPEED, REST_SPEED, RESTING_TIME, VELOCITY_RESOLVER_MAX_ITERATIONS
+
+@dataclass
+class PhysicsConfig:
+  """
+    settings of one PhysicsWorld, defaults from constants.py \n
+    gravity: downwards acceleration, per second^2 \n
+    coe: coefficient of restitution \n
+    velocity_iterations / contact_iterations: caps of resolve_collusions_simple \n
+    solver_iterations: detect / resolve rounds of resolve_collusions_advanced \n
+    resting_time: seconds a body must barely move before it rests \n
+    rest_speed / rest_angular_speed: how fast (per second) a body may move since the last step and still count as not moving \n
+    delta / delta_theta: how far (squared distance / angle) a body may drift from where it began barely moving \n
+    these are in seconds, not steps, so bodies rest the same way at any step rate
+  """
+  gravity: float = GRAVITY
+  coe: float = COE
+  velocity_iterations: int = VELOCITY_RESOLVER_MAX_ITERATIONS
+  contact_iterations: int = CONTACT_RESOLVER_MAX_ITERATIONS
+  solver_iterations: int = 10
+  resting_time: float = RESTING_TIME
+  rest_speed: float = REST_SPEED
+  rest_angular_speed: float = REST_ANGULAR_SPEED
+  delta: float = DELTA
+  delta_theta: float = DELTA_THETA
@@ -1,11 +1,14 @@
-GRAVITY = 3
+GRAVITY = 180 # per second^2, 3 per frame at 60 fps
 COE = 0.3
 VELOCITY_RESOLVER_MAX_ITERATIONS = 100
 CONTACT_RESOLVER_MAX_ITERATIONS = 100
 SCREEN_WIDTH = 1500
 SCREEN_HEIGHT = 800
 EPS = 1E-5
+GJK_VERTEX_THRESHOLD = 16 # pairs with more vertices than this (in total) use GJK / EPA instead of SAT
 
-RESTING_CONTACT_THRES = 50 # number of iterations before we mark contact as resting
-DELTA = 2**2 # 
+RESTING_TIME = 50 / 60 # seconds a body must barely move before we mark contact as resting
+REST_SPEED = 120 # per second, a body moving slower (since the last step) might be resting. 2 per frame at 60 fps
+REST_ANGULAR_SPEED = 0.6 # radians per second, 0.01 per frame at 60 fps
+DELTA = 2**2 # squared distance a body may drift while it might be resting
 DELTA_THETA = 0.01
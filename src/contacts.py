@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from collusion import CollusionData
+
+FeatureKey = tuple[int, int, int]
+
+class ContactCache:
+  """
+    accumulated impulses of every contact, kept between steps so the solver can warm start \n
+    contacts are keyed by CollusionData.feature_key, so a contact is found again
+    as long as the same edge of one body touches the other body
+  """
+  def __init__(self, warm_start_factor: float = 0.8) -> None:
+    """
+      warm_start_factor: fraction of last step's impulse applied at the start of a step
+    """
+    self.warm_start_factor = warm_start_factor
+    self.impulses: dict[FeatureKey, list[float]] = {}
+    self.current: dict[FeatureKey, list[float]] = {}
+
+  def begin_step(self):
+    self.current = {}
+
+  def end_step(self):
+    """
+      keep what was stored this step, contacts which were not seen are dropped
+    """
+    self.impulses = self.current
+    self.current = {}
+
+  def warm_start(self, key: FeatureKey, count: int) -> list[float]:
+    """
+      impulses to start a contact with 'count' contact points from \n
+      if the number of points changed since last step, the total impulse is shared evenly
+    """
+    prev = self.impulses.get(key)
+    if prev is None or count == 0:
+      return [0.0] * count
+    if len(prev) != count:
+      prev = [sum(prev) / count] * count
+    return [self.warm_start_factor * imp for imp in prev]
+
+  def store(self, key: FeatureKey, impulses: list[float]):
+    self.current[key] = impulses
+
+def contact_key(collusion_data: CollusionData) -> FeatureKey:
+  key = collusion_data.feature_key
+  if key:
+    return key
+  ids = sorted((collusion_data.objA.body_id, collusion_data.objB.body_id))
+  return (ids[0], -1, ids[1])
+
+@dataclass
+class ContactImpulse:
+  """
+    impulse of a contact so far this step, when resolve_collusions_advanced warm starts \n
+    target: separating velocity the contact should end with, restitution of the approach velocity
+    from before the warm start impulse \n
+    total: impulse applied at the average contact point, stored shared evenly by the 'count' contact points
+  """
+  target: float
+  total: float
+  count: int
@@ -9,8 +9,9 @@ from common import StateManager
 from constants import GRAVITY, SCREEN_HEIGHT, SCREEN_WIDTH
 from classes import Polygon
 from engine import Engine
+from snapshot import WorldSnapshot
 from helper import get_square, rot_90_c, screen_to_world, world_to_screen
-from copy import deepcopy
+from timestep import FixedTimestep
 from ui_lib2 import MouseEvent
 from ui2 import UILayer
 
@@ -18,10 +19,17 @@ from ui2 import UILayer
 # each object has a 'click' event handler
 # this is how we will interact with the objects 
 class Controller:
-  def __init__(self) -> None:
+  def __init__(self, physics_rate: float = 60, max_steps_per_frame: int = 8, fps: int = 60) -> None:
+    """
+      physics_rate: physics steps per second, independent of the frame rate (eg. 240) \n
+      max_steps_per_frame: most physics steps run for one rendered frame \n
+      fps: frame rate the display is capped at
+    """
     pygame.init()
     self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     self.clock = pygame.time.Clock()
+    self.fps = fps
+    self.timestep = FixedTimestep(physics_rate, max_steps_per_frame)
     self.running = False
     
     self.global_state = StateManager()
@@ -51,7 +59,7 @@ class Controller:
   def debug_mode(self):
     self.running = True
     
-    saves: list[Engine] = [self.engine]
+    saves: list[WorldSnapshot] = [self.engine.snapshot()]
     idx: int = 0 # points to current state
     last_frame_collusions: list[CollusionData] = []
     
@@ -60,13 +68,12 @@ class Controller:
       nonlocal last_frame_collusions
       idx += 1
       print(f'go forward to state {idx}')
-      new_engine = deepcopy(self.engine)
-      cols = new_engine.update(1/60) # get new state from latest
+      self.engine.restore(saves[idx - 1])
+      cols = self.engine.update(1/60) # get new state from latest
       if idx == len(saves):
-        saves.append(new_engine)
+        saves.append(self.engine.snapshot())
       else:
-        saves[idx] = new_engine
-      self.engine = saves[idx]
+        saves[idx] = self.engine.snapshot()
       print(f'state {idx}')
       for b in self.engine.bodies:
         print(b.body_id)
@@ -84,7 +91,9 @@ class Controller:
       nonlocal last_frame_collusions
       idx = max(0, idx - 1)
       print(f'go back to state {idx}')
-      self.engine = saves[idx]
+      self.engine.restore(saves[idx])
+      # they belong to the state we left
+      last_frame_collusions = []
       print(f'state: {idx}')
       for b in self.engine.bodies:
         print(b.get_points_global())
@@ -108,7 +117,7 @@ class Controller:
             
           elif event.key == pygame.K_s:
             with open('save', 'wb') as f:
-              pickle.dump(self.engine, f)
+              pickle.dump(self.engine.snapshot(), f)
             print('saved')
             
           elif event.key == pygame.K_p:
@@ -136,6 +145,7 @@ class Controller:
   def play(self):
     
     self.running = True
+    frame_time = 1 / self.fps
     while self.running:
       mouse_pos_frame = Vector2(pygame.mouse.get_pos())
       mouse_event: MouseEvent = MouseEvent(mouse_pos_frame, 'none')
@@ -155,8 +165,7 @@ class Controller:
           # clear 
           if event.key == pygame.K_c:
             print('removed all movable entities')
-            self.engine.bodies = [b for b in self.engine.bodies if b.mass < 0]
-            self.engine.id_gen = len(self.engine.bodies)
+            self.engine.remove_movable_bodies()
       
       # say we have a click / hover event
       # - first, make the UI consume the click / hover / mousedown / mouseup
@@ -165,15 +174,18 @@ class Controller:
       mouse_event_2 = self.ui_layer.handle_input(mouse_event)
       self.engine.handle_input(mouse_event_2)
       
-      # draw items
+      # physics, in fixed steps for the time the last frame took
+      for _ in range(self.timestep.advance(frame_time)):
+        self.engine.update(self.timestep.dt)
+
+      # draw items, between the last two states by the time left in the accumulator
       self.screen.fill('white')
 
-      self.engine.draw(self.screen)
+      self.engine.draw(self.screen, self.timestep.alpha())
       self.ui_layer.draw(self.screen)
             
-      self.engine.update(1 / 60)
       pygame.display.flip()
-      self.clock.tick(60)
+      frame_time = self.clock.tick(self.fps) / 1000
 
     pygame.quit()
 
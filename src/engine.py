@@ -3,14 +3,37 @@ from typing import cast
 from pygame.math import Vector2
 from classes import *
 from collusion import *
-from common import Add, CircleInformation, Drag, ObjectInformation, PolygonInformation, State, StateManager, circle_graphic, get_polygon_surface, get_width_height, label, square_graphic, triangle_graphic
-from constants import CONTACT_RESOLVER_MAX_ITERATIONS, SCREEN_WIDTH, VELOCITY_RESOLVER_MAX_ITERATIONS
+from common import Add, CircleInformation, Drag, ObjectInformation, PolygonInformation, State, StateManager, circle_graphic, draw_arrow, get_polygon_surface, get_width_height, label, square_graphic, triangle_graphic
+from constants import SCREEN_WIDTH
+from physics import PhysicsWorld
+from snapshot import WorldSnapshot
 from pygame import Surface
 import pygame
 import pickle
 from ui_lib2 import HitBox, MouseEvent
 
 
+def draw_polygon(screen: Surface, polygon: Polygon, alpha: float = 1):
+  """
+    alpha: draw this far between the previous and the current transform, see Polygon.get_points_interpolated \n
+    a body being dragged is always drawn where it is, so it stays under the mouse
+  """
+  if polygon.is_being_dragged:
+    alpha = 1
+  points = polygon.get_points_global() if alpha >= 1 else polygon.get_points_interpolated(alpha)
+  screen_points = world_to_screen(points)
+  mid = avg(screen_points)
+  pygame.draw.polygon(screen, polygon.fill_color, screen_points)
+  lab = label(str(polygon.body_id), 'Arial', 10)
+  rect = pygame.Rect((0, 0), (lab.get_width(), lab.get_height()))
+  rect.center = (int(mid.x), int(mid.y))
+  screen.blit(lab, rect)
+  if polygon.border_thickness > 0:
+    pygame.draw.polygon(screen, polygon.border_color, screen_points, polygon.border_thickness)
+  
+  if polygon.draw_vel_vector:
+    draw_arrow(polygon.center_of_mass, polygon.center_of_mass + polygon.linear_velocity, screen)
+
 def info_to_graphic(obj_info: ObjectInformation, color: tuple[int, int, int, int]):
   if isinstance(obj_info, PolygonInformation):
     # draw full scale object
@@ -255,12 +278,12 @@ def worldify_mouse_event(mouse_event: MouseEvent | None):
     return None
   return mouse_event2
 
-class Engine:
-  def __init__(self, global_state_manager: StateManager):
-    self.bodies: list[Polygon] = []
-    self.timer = 0
-    self.id_gen = 0
-
+class Engine(PhysicsWorld):
+  def __init__(self, global_state_manager: StateManager, **kwargs):
+    """
+      a PhysicsWorld which can be drawn and interacted with, kwargs are passed on to PhysicsWorld
+    """
+    super().__init__(**kwargs)
     self.global_state_manager = global_state_manager
     self.global_state_manager.add_subscriber(self)
     
@@ -269,94 +292,30 @@ class Engine:
     
     self.pressed = False
     self.mouse_over = False
-    
-  def remove_movable_bodies(self):
-    self.bodies = [b for b in self.bodies if b.mass < 0]
-    self.id_gen = len(self.bodies)
-  
-  def add_polygonal_body(self, points: list[Vector2], immovable: bool = False):
+
+  def restore(self, snapshot: WorldSnapshot):
     """
-      points: world coordinates\n
-      immovable: self explanatory\n
-      returns the polygonal body created
+      as PhysicsWorld.restore, the state instance is made again for the restored bodies
     """
-    new_body = Polygon(points, self.id_gen, immovable)
-    self.id_gen += 1
-    self.bodies.append(new_body)
-    return new_body
-  
-  def apply_force(self, target: Polygon, contact_point_world: Vector2, force_vector: Vector2):
-    target.apply_force(contact_point_world, force_vector)
-  
-  def resolve_collusions_simple(self, dt: float):
+    super().restore(snapshot)
+    self.instance_state = get_new_state_instance_from_global(self.global_state_manager, self, Vector2(-1, -1))
+    self.extra_to_draw_frame = []
+
+  def remove_movable_bodies(self):
     """
-      resolve collusions, NOT taking into account new collusions which are created
+      as PhysicsWorld.remove_movable_bodies, the state instance is made again so it lets go of the removed bodies
     """
-    # check for collusions
-    collusions: list[CollusionData] = []
-    for i in range(len(self.bodies)):
-      for j in range(i + 1, len(self.bodies)):
-        tmp = collide(self.bodies[i], self.bodies[j])
-        if tmp:
-          collusions.append(tmp)
-  
-    # debug
-    # - collusions before any resolution
-    ret = deepcopy(collusions)
-    
-    # resolve velocities
-    for _ in range(max(VELOCITY_RESOLVER_MAX_ITERATIONS, 2*len(collusions))):
-      mn_sep_val = 0.0 # want this to be negative, or else no objects are colliding
-      min_idx = -1
-      for i in range(len(collusions)):
-        sep_val = recalculate_separating_velocity(collusions[i])
-        if sep_val < mn_sep_val:
-          mn_sep_val = sep_val
-          min_idx = i
-      if min_idx == -1 or mn_sep_val >= 0:
-        break
-      resolve_velocity(collusions[min_idx], dt)
+    super().remove_movable_bodies()
+    self.instance_state = get_new_state_instance_from_global(self.global_state_manager, self, Vector2(-1, -1))
+    self.extra_to_draw_frame = []
 
-    # resolve interpenetration
-    num_iters = 0
-    for _ in range(max(CONTACT_RESOLVER_MAX_ITERATIONS, 2*len(collusions))):
-      num_iters += 1
-      mx_penetration = 0.0 # want this to be positive, else no penetrations
-      max_idx = -1
-      for i in range(len(collusions)):
-        penetration = recalculate_penetration(collusions[i])
-        if penetration > mx_penetration:
-          mx_penetration = penetration
-          max_idx = i
-      if max_idx == -1 or mx_penetration <= 0:
-        break
-      resolve_penetration(collusions[max_idx])
-    return ret
-  
-  def resolve_collusions_advanced(self, num_iters: int, dt: float):
+  def draw(self, surface: Surface, alpha: float = 1):
     """
-      repeat num_iters times:
-      - delect collusions
-      - resolve collusions
+      alpha: fraction of a physics step since the last update, bodies are drawn
+      that far between their previous and current transforms
     """
-    for _ in range(num_iters):
-      collusions: list[CollusionData] = []
-      for i in range(len(self.bodies)):
-        for j in range(i + 1, len(self.bodies)):
-          tmp = collide(self.bodies[i], self.bodies[j])
-          if tmp:
-            collusions.append(tmp)
-      if len(collusions) == 0:
-        break
-      
-      for col in collusions:
-        if len(col.contact_points) > 0:
-          resolve_velocity(col, dt)
-          resolve_penetration(col) 
-  
-  def draw(self, surface: Surface):
     for b in self.bodies:
-      b.draw(surface)
+      draw_polygon(surface, b, alpha)
       
     for d in self.extra_to_draw_frame:
       surface.blit(d.to_draw, world_to_screen(d.top_left))
@@ -385,38 +344,3 @@ class Engine:
       self.instance_state = get_new_state_instance_from_global(self.global_state_manager, self, mouse_event.position if mouse_event else Vector2(-1, -1))
       self.global_state_manager.consume_notification(self)
     self.instance_state.handle_input(mouse_event)
-  
-  def update(self, dt: float):
-    # delete all forces
-    for b in self.bodies:
-      b.linear_acceleration = Vector2(0, 0)
-
-    # apply gravity
-    for b in self.bodies:
-      b.apply_force(b.center_of_mass, Vector2(0, -GRAVITY * b.mass))
-    
-    # free body update
-    for body in self.bodies:
-      body.update_unconstrained(dt)
-      
-    # resolve collusions
-    self.resolve_collusions_advanced(10, dt)
-
-    # get neighbours of each body
-    for b in self.bodies:
-      b.touching.clear()
-    for i in range(len(self.bodies)):
-      for j in range(i + 1, len(self.bodies)):
-        c = collide(self.bodies[i], self.bodies[j], True) # negative so get everything in vicinity
-        if c != None:
-          self.bodies[i].touching.add(self.bodies[j])
-          self.bodies[j].touching.add(self.bodies[i])
-
-    # mark potential bodies as resting
-    for b in self.bodies:
-      b.might_be_resting = might_be_stationary(b)
-
-    for b in self.bodies:
-      b.update_rest()
-    
-    return cast(list[CollusionData], [])
\ No newline at end of file
@@ -0,0 +1,41 @@
+import numpy as np
+from body_store import BodyStore
+from classes import ForceGenerator
+
+class ForceRegistry:
+  """
+    force generators of an engine, grouped by kind (class) \n
+    each step, every kind is applied in one call to its apply_batch, which times its generators
+  """
+  def __init__(self) -> None:
+    self.generators: dict[type[ForceGenerator], list[ForceGenerator]] = {}
+    # what apply_batch keeps between steps for each kind, emptied when a generator of that kind is added or removed
+    self.caches: dict[type[ForceGenerator], dict] = {}
+    # number of adds and removes so far, for those who batch several registries together (WorldBatch)
+    self.changes = 0
+    # seconds spent on each generator in the last step
+    self.timings: dict[ForceGenerator, float] = {}
+
+  def add(self, generator: ForceGenerator):
+    self.generators.setdefault(type(generator), []).append(generator)
+    self.caches.pop(type(generator), None)
+    self.changes += 1
+
+  def remove(self, generator: ForceGenerator):
+    gens = self.generators.get(type(generator), [])
+    if generator in gens:
+      gens.remove(generator)
+      self.caches.pop(type(generator), None)
+      self.changes += 1
+
+  def apply(self, store: BodyStore, rows: np.ndarray):
+    """
+      apply all generators, only to the bodies at 'rows' of store (the ones simulated this step)
+    """
+    active = np.zeros(len(store.rot), dtype=bool)
+    active[rows] = True
+    self.timings = {}
+    for (kind, gens) in self.generators.items():
+      if len(gens) == 0:
+        continue
+      kind.apply_batch(gens, store, active, self.caches.setdefault(kind, {}), self.timings)
@@ -0,0 +1,134 @@
+from pygame.math import Vector2
+from helper import rot_90_c
+
+# GJK / EPA on the minkowski difference A - B of two convex polygons
+# - A and B intersect iff A - B contains the origin
+# - the distance between A and B is the distance from the origin to A - B
+# - if they intersect, the edge of A - B closest to the origin gives the penetration normal and depth
+
+GJK_MAX_ITERATIONS = 64
+EPA_MAX_ITERATIONS = 64
+TOLERANCE = 1E-9
+
+def support(points: list[Vector2], d: Vector2) -> Vector2:
+  """
+    point of the polygon furthest along d
+  """
+  best = points[0]
+  best_dist = best.dot(d)
+  for p in points:
+    dist = p.dot(d)
+    if dist > best_dist:
+      best = p
+      best_dist = dist
+  return best
+
+def support_difference(points_a: list[Vector2], points_b: list[Vector2], d: Vector2) -> Vector2:
+  """
+    point of A - B furthest along d
+  """
+  return support(points_a, d) - support(points_b, -d)
+
+def closest_on_segment(a: Vector2, b: Vector2) -> tuple[Vector2, list[Vector2]]:
+  """
+    point of segment ab closest to the origin, and the smallest part of the segment containing it
+  """
+  ab = b - a
+  length_sq = ab.dot(ab)
+  if length_sq == 0:
+    return (a, [a])
+  t = -a.dot(ab) / length_sq
+  if t <= 0:
+    return (a, [a])
+  if t >= 1:
+    return (b, [b])
+  return (a + t * ab, [a, b])
+
+def closest_on_simplex(simplex: list[Vector2]) -> tuple[Vector2, list[Vector2]]:
+  """
+    point of the simplex (1 to 3 points) closest to the origin, and the reduced simplex containing it \n
+    if the origin is inside a triangle, returns (0, triangle)
+  """
+  if len(simplex) == 1:
+    return (simplex[0], simplex)
+  if len(simplex) == 2:
+    return closest_on_segment(simplex[0], simplex[1])
+
+  a, b, c = simplex
+  # origin inside the triangle: same side of all three edges
+  d1 = (b - a).cross(-a)
+  d2 = (c - b).cross(-b)
+  d3 = (a - c).cross(-c)
+  if (d1 >= 0 and d2 >= 0 and d3 >= 0) or (d1 <= 0 and d2 <= 0 and d3 <= 0):
+    return (Vector2(0, 0), simplex)
+  best = closest_on_segment(a, b)
+  for (p, q) in [(b, c), (c, a)]:
+    res = closest_on_segment(p, q)
+    if res[0].length_squared() < best[0].length_squared():
+      best = res
+  return best
+
+def gjk(points_a: list[Vector2], points_b: list[Vector2]) -> tuple[bool, list[Vector2], Vector2]:
+  """
+    returns (intersecting, simplex, v) \n
+    if intersecting, the simplex contains the origin \n
+    otherwise v is the closest point of A - B to the origin, |v| is the distance between A and B
+    and v points from B to A
+  """
+  # start from a vertex of A - B (not just any point in it), so epa can grow the simplex
+  d = points_a[0] - points_b[0]
+  v = support_difference(points_a, points_b, d if d.length_squared() > 0 else Vector2(1, 0))
+  simplex: list[Vector2] = [v]
+  for _ in range(GJK_MAX_ITERATIONS):
+    if v.length_squared() <= TOLERANCE:
+      return (True, simplex, v)
+    w = support_difference(points_a, points_b, -v)
+    # no progress towards the origin, v is the closest point
+    if v.dot(v) - v.dot(w) <= TOLERANCE * max(1, v.dot(v)) or w in simplex:
+      return (False, simplex, v)
+    v, simplex = closest_on_simplex(simplex + [w])
+    if len(simplex) == 3:
+      return (True, simplex, v)
+  return (False, simplex, v)
+
+def epa(points_a: list[Vector2], points_b: list[Vector2], simplex: list[Vector2]) -> tuple[Vector2, float]:
+  """
+    penetration normal and depth of two intersecting polygons, given the simplex from gjk \n
+    the normal points from A towards B: moving A by -depth * normal separates them
+  """
+  polytope = list(simplex)
+  # grow a point or a segment through the origin into a triangle
+  if len(polytope) == 1:
+    polytope.append(support_difference(points_a, points_b, -polytope[0] if polytope[0].length_squared() > 0 else Vector2(1, 0)))
+  if len(polytope) == 2:
+    a, b = polytope
+    perp = rot_90_c(b - a) if (b - a).length_squared() > 0 else Vector2(0, 1)
+    c1 = support_difference(points_a, points_b, perp)
+    c2 = support_difference(points_a, points_b, -perp)
+    polytope.append(c1 if abs((b - a).cross(c1 - a)) >= abs((b - a).cross(c2 - a)) else c2)
+  # anticlockwise order, so rot_90_c of an edge is its outward normal
+  if (polytope[1] - polytope[0]).cross(polytope[2] - polytope[0]) < 0:
+    polytope[1], polytope[2] = polytope[2], polytope[1]
+
+  normal = Vector2(0, 0)
+  dist = 0.0
+  for _ in range(EPA_MAX_ITERATIONS):
+    # edge closest to the origin
+    idx = -1
+    dist = 1E15
+    for i in range(len(polytope)):
+      a = polytope[i]
+      b = polytope[(i + 1) % len(polytope)]
+      if a == b:
+        continue
+      n = rot_90_c(b - a).normalize()
+      d = n.dot(a)
+      if d < dist:
+        dist = d
+        idx = i
+        normal = n
+    w = support_difference(points_a, points_b, normal)
+    if w.dot(normal) - dist <= TOLERANCE * max(1, dist) or w in polytope:
+      break
+    polytope.insert(idx + 1, w)
+  return (normal, dist)
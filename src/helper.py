@@ -4,6 +4,8 @@ from pygame.math import Vector2
 
 from constants import EPS, SCREEN_HEIGHT
 
+AlphaColor = tuple[int, int, int, int]
+
 
 
 
@@ -88,6 +90,32 @@ def rot_90_c(vec: Vector2):
   """
   return Vector2(vec.y, -vec.x)
 
+def separating_axes(points: list[Vector2]) -> tuple[list[Vector2], list[tuple[int, int]]]:
+  """
+    unit edge normals of a convex polygon (AC order), one per axis \n
+    parallel edges share an axis, so eg. a box has 2 axes instead of 4 \n
+    returns (normals, edges), where edges[k] = (edge with normals[k], opposite edge with -normals[k] or -1) \n
+    edge i goes from points[i] to points[i + 1]
+  """
+  N = len(points)
+  edge_normals = [rot_90_c(points[(i + 1) % N] - points[i]).normalize() for i in range(N)]
+  normals: list[Vector2] = []
+  edges: list[tuple[int, int]] = []
+  used = [False] * N
+  for i in range(N):
+    if used[i]:
+      continue
+    used[i] = True
+    opposite = -1
+    for j in range(i + 1, N):
+      if not used[j] and edge_normals[i].dot(edge_normals[j]) < 0 and abs(edge_normals[i].cross(edge_normals[j])) < 1E-9:
+        opposite = j
+        used[j] = True
+        break
+    normals.append(edge_normals[i])
+    edges.append((i, opposite))
+  return (normals, edges)
+
 def clip(points: list[Vector2], n: Vector2, o: float):
   """
     assume len(points) <= 2\n
@@ -143,4 +171,12 @@ def to_tuple(v: Vector2):
 #       func(mouse_event, self)
 #     else:
 #       default(mouse_event)
-#   return res
\ No newline at end of file
+#   return res
+
+def avg(points: list[Vector2]):
+  return Vector2(sum(map(lambda p: p.x, points)) / len(points), sum(map(lambda p: p.y, points)) / len(points))
+
+def lighten(color: AlphaColor, amount: int) -> AlphaColor:
+  new_color = [min(a + amount, 255) for a in color]
+  new_color[3] = 255
+  return tuple(new_color) # type: ignore
@@ -0,0 +1,45 @@
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from broadphase import AABB, union
+from classes import Polygon
+
+@dataclass
+class Island:
+  """
+    group of movable bodies connected through touching \n
+    aabb: bounding box of every body in the island
+  """
+  bodies: list[Polygon]
+  aabb: AABB
+
+def build_islands(bodies: list[Polygon], touching: Mapping[Polygon, Iterable[Polygon]]) -> list[list[Polygon]]:
+  """
+    connected components of the touching graph over the movable bodies \n
+    immovable bodies don't join islands together, otherwise everything on the floor would be one island \n
+    islands (and the bodies in them) are in the same order as 'bodies'
+  """
+  parent: dict[Polygon, Polygon] = {b: b for b in bodies if b.mass > 0}
+
+  def find(b: Polygon) -> Polygon:
+    while parent[b] is not b:
+      parent[b] = parent[parent[b]]
+      b = parent[b]
+    return b
+
+  for b in parent:
+    for other in touching.get(b, []):
+      if other in parent:
+        ra, rb = find(b), find(other)
+        if ra is not rb:
+          parent[rb] = ra
+
+  islands: dict[Polygon, list[Polygon]] = {}
+  for b in parent:
+    islands.setdefault(find(b), []).append(b)
+  return list(islands.values())
+
+def make_island(bodies: list[Polygon]) -> Island:
+  aabb = bodies[0].get_aabb_global()
+  for b in bodies[1:]:
+    aabb = union(aabb, b.get_aabb_global())
+  return Island(bodies, aabb)
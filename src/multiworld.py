@@ -0,0 +1,131 @@
+from typing import Any
+import numpy as np
+from body_store import BodyStore
+from classes import ForceGenerator, Polygon
+from collusion import CollusionData, collide
+from contacts import ContactImpulse, FeatureKey
+from narrowphase import collide_batch
+from parallel import ParallelIslandSolver
+from physics import PhysicsWorld
+
+class WorldBatch:
+  """
+    many small independent worlds stepped together \n
+    the worlds share one BodyStore (store.world is the world of each row), so forces and integration
+    run once for every body of every world, and each solver round runs the narrowphase once for the
+    pairs of every world. Each world is stepped exactly like PhysicsWorld.update would
+  """
+  def __init__(self, batched_narrowphase: bool = True) -> None:
+    """
+      batched_narrowphase: test the pairs of all worlds with one collide_batch, instead of collide on each pair
+    """
+    self.store = BodyStore()
+    self.worlds: list[PhysicsWorld] = []
+    self.batched_narrowphase = batched_narrowphase
+    # as ForceRegistry.caches, for the generators of every world together.
+    # Valid while force_changes is the ForceRegistry.changes of each world
+    self.force_caches: dict[type[ForceGenerator], dict] = {}
+    self.force_changes: tuple[int, ...] = ()
+    # seconds spent on each generator in the last step
+    self.timings: dict[ForceGenerator, float] = {}
+
+  def add_world(self, **kwargs: Any) -> PhysicsWorld:
+    """
+      kwargs are passed on to PhysicsWorld \n
+      a ParallelIslandSolver isn't allowed, its process pool would solve one world at a time while the batch waits.
+      A SequentialImpulseSolver is, but such a world is solved on its own (see resolve_collusions)
+    """
+    if isinstance(kwargs.get('solver'), ParallelIslandSolver):
+      raise ValueError('worlds of a WorldBatch cannot use a ParallelIslandSolver')
+    world = PhysicsWorld(store=self.store, world_index=len(self.worlds), **kwargs)
+    self.worlds.append(world)
+    return world
+
+  def compact(self):
+    """
+      drop the rows of bodies removed from their worlds
+    """
+    self.store.compact([b for w in self.worlds for b in w.bodies])
+
+  def narrowphase(self, pairs: list[tuple[Polygon, Polygon]]) -> list[CollusionData]:
+    if self.batched_narrowphase:
+      return collide_batch(pairs)
+    collusions: list[CollusionData] = []
+    for (a, b) in pairs:
+      tmp = collide(a, b)
+      if tmp:
+        collusions.append(tmp)
+    return collusions
+
+  def update(self, dt: float) -> list[list[CollusionData]]:
+    """
+      step every world by dt, returns the collusions of the last resolve pass of each world (as PhysicsWorld.update)
+    """
+    bodies = [w.begin_step() for w in self.worlds]
+    awake = [b for bs in bodies for b in bs]
+    rows = self.store.rows(awake)
+
+    self.store.save_previous()
+    self.store.clear_forces(rows)
+
+    # generators of the same kind, from every world, in one go
+    generators: dict[type[ForceGenerator], list[ForceGenerator]] = {}
+    for w in self.worlds:
+      for (kind, gens) in w.forces.generators.items():
+        generators.setdefault(kind, []).extend(gens)
+    changes = tuple(w.forces.changes for w in self.worlds)
+    if changes != self.force_changes:
+      self.force_caches = {}
+      self.force_changes = changes
+    active = np.zeros(len(self.store.rot), dtype=bool)
+    active[rows] = True
+    self.timings = {}
+    for (kind, gens) in generators.items():
+      if len(gens) > 0:
+        kind.apply_batch(gens, self.store, active, self.force_caches.setdefault(kind, {}), self.timings)
+
+    moving = self.store.rows([b for b in awake if b.mass > 0 and not b.resting and not b.is_being_dragged])
+    self.store.integrate(moving, dt)
+
+    resolved = self.resolve_collusions(dt)
+
+    for (w, bs) in zip(self.worlds, bodies):
+      w.end_step(bs, dt)
+    return resolved
+
+  def resolve_collusions(self, dt: float):
+    """
+      resolve_collusions_advanced of every world, with the rounds of all worlds done together \n
+      worlds with a sequential impulse solver are solved on their own, with the collusions of their own narrowphase \n
+      returns the collusions of the last resolve pass of each world
+    """
+    rounds = [w.config.solver_iterations for w in self.worlds]
+    accumulated: list[dict[FeatureKey, ContactImpulse]] = [{} for _ in self.worlds]
+    resolved: list[list[CollusionData]] = [[] for _ in self.worlds]
+    running: list[int] = []
+    for (i, w) in enumerate(self.worlds):
+      if w.solver:
+        resolved[i] = w.resolve_collusions_sequential(w.solver)
+        continue
+      if w.contact_cache:
+        w.contact_cache.begin_step()
+      running.append(i)
+
+    r = 0
+    while len(running) > 0:
+      running = [i for i in running if r < rounds[i]]
+      pairs = [p for i in running for p in self.worlds[i].find_near_pairs()]
+      by_world: dict[int, list[CollusionData]] = {i: [] for i in running}
+      for col in self.narrowphase(pairs):
+        by_world[int(self.store.world[col.objA.index])].append(col)
+      # a world is done once it has no collusions left
+      running = [i for i in running if len(by_world[i]) > 0]
+      for i in running:
+        self.worlds[i].resolve_round(by_world[i], dt, accumulated[i])
+        resolved[i] = by_world[i]
+      r += 1
+
+    for (i, w) in enumerate(self.worlds):
+      if not w.solver:
+        w.store_impulses(accumulated[i])
+    return resolved
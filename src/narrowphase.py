@@ -0,0 +1,142 @@
+import math
+import numpy as np
+from pygame.math import Vector2
+from classes import Polygon
+from collusion import TOUCH_THRES, CollusionData, collide, contact_data
+from constants import GJK_VERTEX_THRESHOLD
+
+def world_arrays(bodies: list[Polygon]):
+  """
+    world space points and axis normals of every body, padded to the same size \n
+    padding repeats the last point / axis, which changes no minimum or maximum \n
+    returns (px, py, nx, ny, edges, opposites)
+  """
+  U = len(bodies)
+  V = max(len(b.points_local) for b in bodies)
+  A = max(len(b.axes) for b in bodies)
+  points = np.empty((U, V, 2))
+  normals = np.empty((U, A, 2))
+  axes = np.empty((U, A, 2), dtype=int)
+  transform = np.empty((U, 4))
+  for u, b in enumerate(bodies):
+    n = len(b.points_local)
+    points[u, :n] = b.points_local_array
+    points[u, n:] = b.points_local_array[-1]
+    a = len(b.axes)
+    normals[u, :a] = b.normals_local_array
+    normals[u, a:] = b.normals_local_array[-1]
+    axes[u, :a] = b.axes_array
+    axes[u, a:] = b.axes_array[-1]
+    rot = b.rotational_displacement
+    transform[u] = (b.center_of_mass.x, b.center_of_mass.y, math.cos(rot), math.sin(rot))
+
+  # same operations, in the same order, as Polygon.update_transform_cache
+  x, y = transform[:, 0, None], transform[:, 1, None]
+  c, s = transform[:, 2, None], transform[:, 3, None]
+  lx, ly = points[:, :, 0], points[:, :, 1]
+  px = c*lx - s*ly + x
+  py = s*lx + c*ly + y
+  lnx, lny = normals[:, :, 0], normals[:, :, 1]
+  nx = c*lnx - s*lny
+  ny = s*lnx + c*lny
+  return (px, py, nx, ny, axes[:, :, 0], axes[:, :, 1])
+
+def project(nx: np.ndarray, ny: np.ndarray, px: np.ndarray, py: np.ndarray):
+  """
+    [pair, axis, point] dot products of each axis with each point
+  """
+  return nx[:, :, None] * px[:, None, :] + ny[:, :, None] * py[:, None, :]
+
+def rects_collide(px: np.ndarray, py: np.ndarray, ia: np.ndarray, ib: np.ndarray, touch: bool):
+  """
+    same test as the Rect check at the start of collide, including the integer rounding of Rect
+  """
+  left = np.trunc(px.min(1))
+  top = np.trunc(py.min(1))
+  width = np.trunc(px.max(1) - px.min(1))
+  height = np.trunc(py.max(1) - py.min(1))
+  if touch:
+    # adjust_rect
+    d = TOUCH_THRES - 1
+    left, top = left + d, top + d
+    width, height = width - 2*d, height - 2*d
+  non_empty = (width > 0) & (height > 0)
+  return non_empty[ia] & non_empty[ib] \
+    & (left[ia] < left[ib] + width[ib]) & (left[ib] < left[ia] + width[ia]) \
+    & (top[ia] < top[ib] + height[ib]) & (top[ib] < top[ia] + height[ia])
+
+def collide_batch(pairs: list[tuple[Polygon, Polygon]], touch: bool = False) -> list[CollusionData]:
+  """
+    separating axis test for all pairs at once \n
+    gives the same result as running collide (without an axis cache) on every pair, keeping only the collusions (in pair order) \n
+    like collide, pairs with more than GJK_VERTEX_THRESHOLD vertices in total use GJK / EPA, one pair at a time
+  """
+  large = [len(a.points_local) + len(b.points_local) > GJK_VERTEX_THRESHOLD for (a, b) in pairs]
+  if not any(large):
+    return [cd for (_, cd) in collide_sat_batch(pairs, touch)]
+  small = [k for k in range(len(pairs)) if not large[k]]
+  found = [(small[k], cd) for (k, cd) in collide_sat_batch([pairs[k] for k in small], touch)]
+  for k in range(len(pairs)):
+    if large[k]:
+      cd = collide(pairs[k][0], pairs[k][1], touch)
+      if cd:
+        found.append((k, cd))
+  found.sort(key=lambda f: f[0])
+  return [cd for (_, cd) in found]
+
+def collide_sat_batch(pairs: list[tuple[Polygon, Polygon]], touch: bool = False) -> list[tuple[int, CollusionData]]:
+  """
+    the separating axis test of collide_batch, for every pair whatever its size \n
+    returns the collusions with the position of their pair
+  """
+  if len(pairs) == 0:
+    return []
+  index: dict[Polygon, int] = {}
+  for (a, b) in pairs:
+    index.setdefault(a, len(index))
+    index.setdefault(b, len(index))
+  bodies = list(index)
+  ia = np.array([index[a] for (a, _) in pairs])
+  ib = np.array([index[b] for (_, b) in pairs])
+  (px, py, nx, ny, edges, opposites) = world_arrays(bodies)
+  A = nx.shape[1]
+
+  # axes of the first polygon, then axes of the second polygon (like collide)
+  # own: polygon the axis belongs to, other: the other polygon
+  own = np.concatenate([project(nx[ia], ny[ia], px[ia], py[ia]), project(nx[ib], ny[ib], px[ib], py[ib])], axis=1)
+  other = np.concatenate([project(nx[ia], ny[ia], px[ib], py[ib]), project(nx[ib], ny[ib], px[ia], py[ia])], axis=1)
+  r1_min, r1_max = own.min(2), own.max(2)
+  r2_min, r2_max = other.min(2), other.max(2)
+
+  # range_depth
+  abs_depth = np.where(r1_min > r2_min, r2_max - r1_min, r1_max - r2_min)
+  separated = (abs_depth < TOUCH_THRES).any(1) if touch else (abs_depth <= 0).any(1)
+
+  # candidates for each axis: its edge (along normal), then the opposite edge (along -normal)
+  axis_opposite = np.concatenate([opposites[ia], opposites[ib]], axis=1)
+  plus = np.where(r1_min < r2_min, r1_max - r2_min, np.inf)
+  minus = np.where((axis_opposite >= 0) & (r1_max > r2_max), r2_max - r1_min, np.inf)
+  candidates = np.stack([plus, minus], axis=2).reshape(len(pairs), -1)
+  best = candidates.argmin(1)
+  best_depth = candidates[np.arange(len(pairs)), best]
+
+  # no finite candidate: no axis gives a valid normal, collide returns None for these too
+  hit = rects_collide(px, py, ia, ib, touch) & ~separated & (best_depth < 1E15)
+
+  res: list[tuple[int, CollusionData]] = []
+  for k in np.flatnonzero(hit):
+    axis, flipped = divmod(int(best[k]), 2)
+    (a, b) = pairs[k]
+    (ref, inc) = (a, b) if axis < A else (b, a)
+    u = index[ref]
+    i = axis % A
+    normal = Vector2(float(nx[u, i]), float(ny[u, i]))
+    if flipped:
+      normal = -normal
+      edge = int(opposites[u, i])
+      w_idx = int(other[k, axis].argmax())
+    else:
+      edge = int(edges[u, i])
+      w_idx = int(other[k, axis].argmin())
+    res.append((int(k), contact_data(ref, inc, edge, normal, float(best_depth[k]), w_idx)))
+  return res
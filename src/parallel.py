@@ -0,0 +1,217 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+from constants import COE
+from pygame.math import Vector2
+from body_store import BodyStore
+from classes import Polygon
+from collusion import CollusionData
+from contacts import ContactCache, FeatureKey, contact_key
+from islands import build_islands
+from solver import SequentialImpulseSolver
+
+# columns of the rows sent to a worker: pos (2), rot, vel (2), ang_vel, mass, inertia, inv_mass, inv_inertia
+ROW_COLUMNS = 10
+# columns a worker sends back, the part of a row the solver changes: pos (2), rot, vel (2), ang_vel
+SOLVED_COLUMNS = 6
+
+@dataclass
+class IslandData:
+  """
+    what is sent to a worker for one island, instead of the bodies (which hold the whole store) \n
+    rows: ROW_COLUMNS per body, movable bodies first (in order of first appearance in the contacts) \n
+    movable: number of movable bodies \n
+    ids, shapes: body_id and local points of each body \n
+    contacts: (body a, body b, penetration depth, normal, contact points, feature key) of each collusion,
+    bodies as positions in rows
+  """
+  rows: np.ndarray
+  movable: int
+  ids: list[int]
+  shapes: list[np.ndarray]
+  contacts: list[tuple[int, int, float, tuple[float, float], list[tuple[float, float]], FeatureKey | None]]
+
+def pack_island(collusions: list[CollusionData]) -> IslandData:
+  """
+    the bodies of collusions must share one store
+  """
+  movable = island_bodies(collusions)
+  bodies: dict[Polygon, int] = {b: i for (i, b) in enumerate(movable)}
+  for col in collusions:
+    for b in (col.objA, col.objB):
+      if b not in bodies:
+        bodies[b] = len(bodies)
+  store = collusions[0].objA.store
+  index = store.rows(list(bodies))
+  rows = np.empty((len(bodies), ROW_COLUMNS))
+  rows[:, 0:2] = store.pos[index]
+  rows[:, 2] = store.rot[index]
+  rows[:, 3:5] = store.vel[index]
+  rows[:, 5] = store.ang_vel[index]
+  rows[:, 6] = store.mass[index]
+  rows[:, 7] = store.inertia[index]
+  rows[:, 8] = store.inv_mass[index]
+  rows[:, 9] = store.inv_inertia[index]
+  contacts = [
+    (bodies[col.objA], bodies[col.objB], col.penetration_depth, (col.collusion_normal.x, col.collusion_normal.y),
+      [(p.x, p.y) for p in col.contact_points], col.feature_key)
+    for col in collusions
+  ]
+  return IslandData(rows, len(movable), [b.body_id for b in bodies], [b.points_local_array for b in bodies], contacts)
+
+def unpack_island(data: IslandData) -> list[CollusionData]:
+  """
+    the collusions of an island again, between new bodies in a store of their own
+  """
+  store = BodyStore(len(data.ids))
+  bodies: list[Polygon] = []
+  for (body_id, shape, mass) in zip(data.ids, data.shapes, data.rows[:, 6].tolist()):
+    local = [Vector2(p) for p in shape.tolist()]
+    b = Polygon(local, body_id, mass < 0, store)
+    # exactly the sent points, Polygon would center them again
+    b.set_shape(local)
+    bodies.append(b)
+  store.pos[:] = data.rows[:, 0:2]
+  store.rot[:] = data.rows[:, 2]
+  store.vel[:] = data.rows[:, 3:5]
+  store.ang_vel[:] = data.rows[:, 5]
+  store.mass[:] = data.rows[:, 6]
+  store.inertia[:] = data.rows[:, 7]
+  store.inv_mass[:] = data.rows[:, 8]
+  store.inv_inertia[:] = data.rows[:, 9]
+  return [
+    CollusionData(bodies[a], bodies[b], depth, [Vector2(p) for p in points], Vector2(normal), key)
+    for (a, b, depth, normal, points, key) in data.contacts
+  ]
+
+def solve_contacts(collusions: list[CollusionData], solver: SequentialImpulseSolver, impulses: dict[FeatureKey, list[float]] | None, warm_start_factor: float, coe: float = COE):
+  """
+    solve the collusions of one island in place \n
+    returns the contact impulses to keep for warm starting
+  """
+  cache = None
+  if impulses is not None:
+    cache = ContactCache(warm_start_factor)
+    cache.impulses = impulses
+  solver.solve(collusions, cache, coe)
+  return cache.impulses if cache else None
+
+def solve_island(data: IslandData, solver: SequentialImpulseSolver, impulses: dict[FeatureKey, list[float]] | None, warm_start_factor: float, coe: float = COE):
+  """
+    solve one island in a worker process \n
+    returns the solved columns (SOLVED_COLUMNS) of the island's movable bodies, in the order of data.rows,
+    and the contact impulses to keep for warm starting
+  """
+  collusions = unpack_island(data)
+  stored = solve_contacts(collusions, solver, impulses, warm_start_factor, coe)
+  store = collusions[0].objA.store
+  solved = np.empty((data.movable, SOLVED_COLUMNS))
+  solved[:, 0:2] = store.pos[:data.movable]
+  solved[:, 2] = store.rot[:data.movable]
+  solved[:, 3:5] = store.vel[:data.movable]
+  solved[:, 5] = store.ang_vel[:data.movable]
+  return (solved, stored)
+
+def island_bodies(collusions: list[CollusionData]) -> list[Polygon]:
+  bodies: dict[Polygon, None] = {}
+  for col in collusions:
+    for b in (col.objA, col.objB):
+      if b.mass > 0:
+        bodies[b] = None
+  return list(bodies)
+
+class ParallelIslandSolver:
+  """
+    splits the contacts into islands (bodies connected through contacts, immovable bodies don't connect them)
+    and solves the islands on a process pool, then copies the results back into the bodies \n
+    only the rows and shapes of an island's bodies are sent (see IslandData), and only the solved columns come back \n
+    islands with fewer than inline_threshold contacts are solved in this process, since sending them
+    costs more than solving them. If at most one island is big enough, nothing is sent at all
+  """
+  def __init__(self, solver: SequentialImpulseSolver, workers: int | None = None, inline_threshold: int = 64) -> None:
+    """
+      solver: how each island is solved \n
+      workers: number of worker processes (default: one per core)
+    """
+    self.solver = solver
+    self.workers = workers
+    self.inline_threshold = inline_threshold
+    self.executor: Executor | None = None
+
+  def get_executor(self) -> Executor:
+    if self.executor is None:
+      self.executor = ProcessPoolExecutor(self.workers)
+    return self.executor
+
+  def shutdown(self):
+    """
+      stop the worker processes, a later solve starts new ones
+    """
+    if self.executor:
+      self.executor.shutdown()
+      self.executor = None
+
+  def split(self, collusions: list[CollusionData]) -> list[list[CollusionData]]:
+    """
+      collusions grouped by island, in order of first appearance \n
+      contacts between two immovable bodies belong to no island, they are grouped together (see is_static)
+    """
+    adjacent: dict[Polygon, list[Polygon]] = {}
+    for col in collusions:
+      adjacent.setdefault(col.objA, []).append(col.objB)
+      adjacent.setdefault(col.objB, []).append(col.objA)
+    island_of: dict[Polygon, int] = {}
+    for (i, island) in enumerate(build_islands(list(adjacent), adjacent)):
+      for b in island:
+        island_of[b] = i
+    groups: dict[int, list[CollusionData]] = {}
+    for col in collusions:
+      b = col.objA if col.objA.mass > 0 else col.objB
+      groups.setdefault(island_of.get(b, -1), []).append(col)
+    return list(groups.values())
+
+  @staticmethod
+  def is_static(island: list[CollusionData]) -> bool:
+    """
+      the group of contacts between immovable bodies, nothing moves so it is never worth sending
+    """
+    return island[0].objA.mass < 0 and island[0].objB.mass < 0
+
+  def solve(self, collusions: list[CollusionData], cache: ContactCache | None = None, coe: float = COE):
+    islands = self.split(collusions)
+    # positions in islands of the ones big enough to send
+    big = [i for (i, island) in enumerate(islands) if len(island) >= self.inline_threshold and not self.is_static(island)]
+    if len(big) < 2:
+      self.solver.solve(collusions, cache, coe)
+      return
+
+    factor = cache.warm_start_factor if cache else 0
+    if cache:
+      cache.begin_step()
+
+    def impulses_of(island: list[CollusionData]):
+      if cache is None:
+        return None
+      keys = [contact_key(col) for col in island]
+      return {k: cache.impulses[k] for k in keys if k in cache.impulses}
+
+    executor = self.get_executor()
+    futures = {i: executor.submit(solve_island, pack_island(islands[i]), self.solver, impulses_of(islands[i]), factor, coe) for i in big}
+    inline = {i: solve_contacts(island, self.solver, impulses_of(island), factor, coe) for (i, island) in enumerate(islands) if i not in futures}
+
+    # merge the results back in island order (the order of the contacts), whichever finished first
+    for (i, island) in enumerate(islands):
+      if i in futures:
+        (solved, stored) = futures[i].result()
+        store = island[0].objA.store
+        rows = store.rows(island_bodies(island))
+        store.pos[rows] = solved[:, 0:2]
+        store.rot[rows] = solved[:, 2]
+        store.vel[rows] = solved[:, 3:5]
+        store.ang_vel[rows] = solved[:, 5]
+      else:
+        stored = inline[i]
+      if cache and stored:
+        cache.current.update(stored)
+    if cache:
+      cache.end_step()
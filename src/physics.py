@@ -0,0 +1,415 @@
+import copy
+from pygame.math import Vector2
+from body_store import BodyStore
+from broadphase import Broadphase, BruteForce, aabb_overlap
+from classes import GravityForceGenerator, Polygon, might_be_stationary
+from collusion import TOUCH_MARGIN, TOUCH_THRES, CollusionData, SeparatingAxisCache, apply_impulse, collide, recalculate_penetration, recalculate_separating_velocity, resolve_penetration, resolve_velocity
+from config import PhysicsConfig
+from contacts import ContactCache, ContactImpulse, FeatureKey, contact_key
+from forces import ForceRegistry
+from helper import avg
+from islands import Island, build_islands, make_island
+from narrowphase import collide_batch
+from parallel import ParallelIslandSolver
+from priority_queue import IndexedMaxHeap
+from snapshot import WorldSnapshot, pack_state, unpack_state
+from solver import SequentialImpulseSolver
+
+class PhysicsWorld:
+  """
+    bodies and the step loop, without any drawing or UI (see engine.Engine for those) \n
+    importing this doesn't initialize pygame, so it can run headless
+  """
+  def __init__(self, broadphase: Broadphase | None = None, batched_narrowphase: bool = False, warm_starting: bool = False, island_sleeping: bool = False, solver: SequentialImpulseSolver | ParallelIslandSolver | None = None, config: PhysicsConfig | None = None, store: BodyStore | None = None, world_index: int = 0, deterministic: bool = False):
+    """
+      broadphase: how candidate pairs are found for collide (default: every pair), eg. SweepAndPrune(), SpatialHashGrid(100) or DynamicAABBTree()\n
+      batched_narrowphase: test all candidate pairs at once with numpy (collide_batch)\n
+      warm_starting: keep contact impulses between steps, and start each step from them\n
+      island_sleeping: once every body of an island is resting, skip the whole island until something touches it\n
+      solver: solve contacts with sequential impulses (eg. SequentialImpulseSolver(10)) instead of resolve_collusions_advanced,
+      or ParallelIslandSolver(SequentialImpulseSolver(10)) to solve independent islands on a process pool
+      (close the world when done with it, or use it in a with statement, to stop the processes)\n
+      config: gravity, restitution, iteration caps and rest detection settings of this world (default: from constants.py)\n
+      store / world_index: to share a BodyStore with other worlds (see WorldBatch), and this world's index in it\n
+      deterministic: sort the pairs by body_id (lower id first in each pair), so the collusions and the order
+      they are solved in don't depend on the broadphase or on object identity (set order). Same input, same result
+    """
+    self.config = config if config else PhysicsConfig()
+    self.bodies: list[Polygon] = []
+    # state of every body, see BodyStore
+    self.owns_store = store is None
+    self.store = store if store else BodyStore()
+    self.world_index = world_index
+    # forces applied every step, gravity on every body to begin with
+    self.forces = ForceRegistry()
+    # reads config.gravity every step, setting its 'gravity' sets config.gravity
+    self.gravity_generator = GravityForceGenerator(self.bodies, self.config)
+    self.forces.add(self.gravity_generator)
+    self.broadphase: Broadphase = broadphase if broadphase else BruteForce()
+    self.batched_narrowphase = batched_narrowphase
+    self.contact_cache: ContactCache | None = ContactCache() if warm_starting else None
+    self.separating_axes = SeparatingAxisCache()
+    self.island_sleeping = island_sleeping
+    self.solver = solver
+    self.deterministic = deterministic
+    self.sleeping_islands: list[Island] = []
+    # pairs whose boxes were at most -TOUCH_THRES apart in the last collision pass, see find_near_pairs
+    self.near_pairs: list[tuple[Polygon, Polygon]] = []
+    # bodies close to each body at the end of the last step (used for rest detection and islands),
+    # by body_id in deterministic mode
+    self.touching: dict[Polygon, list[Polygon]] = {}
+    self.timer = 0
+    self.id_gen = 0
+
+  def close(self):
+    """
+      stop the solver's worker processes, if it has any
+    """
+    if isinstance(self.solver, ParallelIslandSolver):
+      self.solver.shutdown()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def remove_movable_bodies(self):
+    removed = [b for b in self.bodies if b.mass > 0]
+    # in place, force generators hold on to the list
+    self.bodies[:] = [b for b in self.bodies if b.mass < 0]
+    # after the ids of the bodies left, so no two bodies share an id
+    self.id_gen = max((b.body_id + 1 for b in self.bodies), default=0)
+    # a shared store is compacted by its owner (WorldBatch.compact), until then the rows are just unused
+    if self.owns_store:
+      self.store.compact(self.bodies)
+    # their rows are reused, so they must not read or write them anymore
+    for b in removed:
+      b.index = -1
+    self.sleeping_islands = []
+    self.near_pairs = []
+    self.touching = {}
+  
+  def snapshot(self) -> WorldSnapshot:
+    """
+      the physics state of the world (bodies, rest detection, sleeping islands, warm starting impulses),
+      to go back to it later with restore \n
+      the transforms and velocities are packed into bytes, not copied as objects
+    """
+    return WorldSnapshot(
+      pack_state(self.store, self.bodies),
+      tuple(self.bodies),
+      self.id_gen,
+      self.timer,
+      tuple(self.sleeping_islands),
+      dict(self.contact_cache.impulses) if self.contact_cache else None
+    )
+
+  def restore(self, snapshot: WorldSnapshot):
+    """
+      go back to the state of snapshot, the bodies are the ones of the snapshot \n
+      if bodies were added or removed since (or the snapshot was unpickled), every body gets a row again,
+      which needs a store of its own \n
+      the broadphase and separating axis caches are emptied, they belong to the abandoned timeline
+    """
+    bodies = list(snapshot.bodies)
+    if len(bodies) != len(self.bodies) or any(a is not b for (a, b) in zip(bodies, self.bodies)):
+      if not self.owns_store:
+        raise ValueError('the bodies changed since the snapshot, and the store is shared')
+      kept = set(bodies)
+      # their rows are given to other bodies, as in remove_movable_bodies
+      for b in self.bodies:
+        if b not in kept:
+          b.index = -1
+      self.store.clear()
+      for b in bodies:
+        b.store = self.store
+        b.index = self.store.allocate()
+    # in place, force generators hold on to the list
+    self.bodies[:] = bodies
+    unpack_state(self.store, self.bodies, snapshot.state, self.world_index)
+    self.id_gen = snapshot.id_gen
+    self.timer = snapshot.timer
+    self.sleeping_islands = list(snapshot.sleeping_islands)
+    if self.contact_cache:
+      self.contact_cache.impulses = dict(snapshot.impulses) if snapshot.impulses else {}
+      self.contact_cache.current = {}
+    # found again by the next step
+    self.near_pairs = []
+    self.touching = {}
+    self.separating_axes = SeparatingAxisCache()
+    self.broadphase.reset()
+
+  def add_polygonal_body(self, points: list[Vector2], immovable: bool = False):
+    """
+      points: world coordinates\n
+      immovable: self explanatory\n
+      returns the polygonal body created
+    """
+    new_body = Polygon(points, self.id_gen, immovable, self.store)
+    self.store.world[new_body.index] = self.world_index
+    self.id_gen += 1
+    self.bodies.append(new_body)
+    return new_body
+  
+  def apply_force(self, target: Polygon, contact_point_world: Vector2, force_vector: Vector2):
+    target.apply_force(contact_point_world, force_vector)
+  
+  def find_pairs(self, margin: float = 0) -> list[tuple[Polygon, Polygon]]:
+    """
+      candidate pairs of the awake bodies from the broadphase, with each box grown by margin
+    """
+    pairs = self.broadphase.get_pairs(self.get_awake_bodies(), margin)
+    if self.deterministic:
+      pairs = sorted(((a, b) if a.body_id < b.body_id else (b, a) for (a, b) in pairs), key=lambda p: (p[0].body_id, p[1].body_id))
+    return pairs
+
+  def find_near_pairs(self) -> list[tuple[Polygon, Polygon]]:
+    """
+      the broadphase query of a collision pass, with the boxes grown so pairs touching as in collide(..., touch=True)
+      (at most -TOUCH_THRES apart) are found too \n
+      the pairs whose boxes are that close are kept in near_pairs, the touching graph is made from them (see update_touching) \n
+      returns the pairs whose boxes overlap, for the narrowphase
+    """
+    # each box grows by half the gap
+    margin = -TOUCH_THRES / 2
+    near: list[tuple[Polygon, Polygon]] = []
+    overlapping: list[tuple[Polygon, Polygon]] = []
+    for (a, b) in self.find_pairs(margin):
+      (box_a, box_b) = (a.get_aabb_global(), b.get_aabb_global())
+      if aabb_overlap(box_a, box_b, margin):
+        near.append((a, b))
+        if aabb_overlap(box_a, box_b):
+          overlapping.append((a, b))
+    self.near_pairs = near
+    return overlapping
+
+  def find_collusions(self) -> list[CollusionData]:
+    """
+      run collide on every pair given by the broadphase (see find_near_pairs)
+    """
+    pairs = self.find_near_pairs()
+    if self.batched_narrowphase:
+      return collide_batch(pairs)
+    collusions: list[CollusionData] = []
+    for (a, b) in pairs:
+      tmp = collide(a, b, axis_cache=self.separating_axes)
+      if tmp:
+        collusions.append(tmp)
+    return collusions
+
+  def resolve_collusions_simple(self, dt: float):
+    """
+      resolve collusions, NOT taking into account new collusions which are created
+    """
+    # check for collusions
+    collusions = self.find_collusions()
+  
+    # debug
+    # - collusions before any resolution
+    ret = copy.deepcopy(collusions)
+    
+    # contacts whose values change when a contact is resolved: the ones sharing a movable body with it
+    by_body: dict[Polygon, list[int]] = {}
+    for (i, col) in enumerate(collusions):
+      for b in (col.objA, col.objB):
+        if b.mass > 0:
+          by_body.setdefault(b, []).append(i)
+    sharing = [sorted({i} | {j for b in (col.objA, col.objB) for j in by_body.get(b, [])}) for (i, col) in enumerate(collusions)]
+
+    # resolve velocities, most negative separating velocity first
+    if len(collusions) > 0:
+      heap = IndexedMaxHeap([-recalculate_separating_velocity(col) for col in collusions])
+      for _ in range(max(self.config.velocity_iterations, 2*len(collusions))):
+        (idx, mx_approach) = heap.top()
+        if mx_approach <= 0:
+          break
+        resolve_velocity(collusions[idx], dt, coe=self.config.coe)
+        for j in sharing[idx]:
+          heap.update(j, -recalculate_separating_velocity(collusions[j]))
+
+    # resolve interpenetration, deepest first
+    if len(collusions) > 0:
+      heap = IndexedMaxHeap([recalculate_penetration(col) for col in collusions])
+      for _ in range(max(self.config.contact_iterations, 2*len(collusions))):
+        (idx, mx_penetration) = heap.top()
+        if mx_penetration <= 0:
+          break
+        resolve_penetration(collusions[idx])
+        for j in sharing[idx]:
+          heap.update(j, recalculate_penetration(collusions[j]))
+    return ret
+  
+  def resolve_collusions_advanced(self, num_iters: int, dt: float):
+    """
+      repeat num_iters times:
+      - delect collusions
+      - resolve collusions
+      returns the collusions of the last round which had any
+    """
+    # impulse of each contact this step, when warm starting
+    accumulated: dict[FeatureKey, ContactImpulse] = {}
+    if self.contact_cache:
+      self.contact_cache.begin_step()
+
+    resolved: list[CollusionData] = []
+    for _ in range(num_iters):
+      collusions = self.find_collusions()
+      if len(collusions) == 0:
+        break
+      self.resolve_round(collusions, dt, accumulated)
+      resolved = collusions
+
+    self.store_impulses(accumulated)
+    return resolved
+
+  def resolve_round(self, collusions: list[CollusionData], dt: float, accumulated: dict[FeatureKey, ContactImpulse]):
+    """
+      one round of resolve_collusions_advanced: resolve velocity then penetration of each collusion \n
+      accumulated: impulse of each contact so far this step, filled in when warm starting
+    """
+    cache = self.contact_cache
+    if cache:
+      # contacts seen for the first time this step bounce off the velocity they approach with,
+      # taken before any warm start impulse
+      new: list[tuple[CollusionData, ContactImpulse]] = []
+      for col in collusions:
+        key = contact_key(col)
+        count = len(col.contact_points)
+        if count > 0 and key not in accumulated:
+          target = -self.config.coe * min(recalculate_separating_velocity(col), 0)
+          accumulated[key] = ContactImpulse(target, sum(cache.warm_start(key, count)), count)
+          new.append((col, accumulated[key]))
+      # then all of them start from last step's impulse, before any is solved
+      for (col, contact) in new:
+        apply_impulse(col, contact.total, avg(col.contact_points))
+
+    for col in collusions:
+      if len(col.contact_points) > 0:
+        if cache:
+          contact = accumulated[contact_key(col)]
+          contact.total = resolve_velocity(col, dt, contact.total, self.config.coe, contact.target)
+          contact.count = len(col.contact_points)
+        else:
+          resolve_velocity(col, dt, coe=self.config.coe)
+        resolve_penetration(col) 
+
+  def store_impulses(self, accumulated: dict[FeatureKey, ContactImpulse]):
+    """
+      keep this step's impulses for warm starting the next one
+    """
+    if self.contact_cache:
+      for (key, contact) in accumulated.items():
+        # applied at the average point, so the same as an even share at each point
+        self.contact_cache.store(key, [contact.total / contact.count] * contact.count)
+      self.contact_cache.end_step()
+  
+  def resolve_collusions_sequential(self, solver: SequentialImpulseSolver | ParallelIslandSolver):
+    """
+      detect collusions once, then solve them all together with sequential impulses \n
+      returns the collusions solved
+    """
+    collusions = self.find_collusions()
+    solver.solve(collusions, self.contact_cache, self.config.coe)
+    return collusions
+
+  def update_touching(self, bodies: list[Polygon]):
+    """
+      bodies are touching if their boxes were at most -TOUCH_THRES apart in the last collision pass of the step (near_pairs),
+      which includes every pair that collided. No narrowphase is run for this \n
+      each pair comes once, in the order of find_pairs. Sorted pairs list the neighbours of each body by body_id
+      (the ones with a lower id come from pairs before the ones with a higher id)
+    """
+    self.touching = {b: [] for b in bodies}
+    for (a, b) in self.near_pairs:
+      self.touching[a].append(b)
+      self.touching[b].append(a)
+
+  def get_awake_bodies(self) -> list[Polygon]:
+    """
+      bodies which are simulated this step (not in a sleeping island)
+    """
+    if len(self.sleeping_islands) == 0:
+      return self.bodies
+    return [b for b in self.bodies if not b.sleeping]
+
+  def wake_islands(self):
+    """
+      wake every sleeping island touched by an awake body, or with a body being dragged
+    """
+    awake_boxes = [b.get_aabb_global() for b in self.bodies if b.mass > 0 and not b.sleeping]
+    still_sleeping: list[Island] = []
+    for island in self.sleeping_islands:
+      if any(b.is_being_dragged for b in island.bodies) or any(aabb_overlap(box, island.aabb, TOUCH_MARGIN) for box in awake_boxes):
+        for b in island.bodies:
+          b.sleeping = False
+          b.stop_resting()
+      else:
+        still_sleeping.append(island)
+    self.sleeping_islands = still_sleeping
+
+  def sleep_islands(self, bodies: list[Polygon]):
+    """
+      put islands where every body is resting to sleep
+    """
+    for island in build_islands(bodies, self.touching):
+      if all(b.resting for b in island):
+        for b in island:
+          b.sleeping = True
+        self.sleeping_islands.append(make_island(island))
+
+  def begin_step(self) -> list[Polygon]:
+    """
+      wake islands if needed, returns the bodies simulated this step
+    """
+    if self.island_sleeping:
+      self.wake_islands()
+    return self.get_awake_bodies()
+
+  def end_step(self, bodies: list[Polygon], dt: float):
+    """
+      rest detection and sleeping of the bodies simulated this step \n
+      dt: length of the step, the rest settings of config are per second
+    """
+    self.update_touching(bodies)
+
+    # mark potential bodies as resting
+    for b in bodies:
+      b.might_be_resting = might_be_stationary(b, dt, self.config.rest_speed, self.config.rest_angular_speed, self.config.delta, self.config.delta_theta)
+
+    resting_steps = max(1, round(self.config.resting_time / dt))
+    for b in bodies:
+      b.update_rest(self.touching.get(b, ()), resting_steps)
+
+    if self.island_sleeping:
+      self.sleep_islands(bodies)
+
+    self.separating_axes.end_step()
+
+  def update(self, dt: float) -> list[CollusionData]:
+    """
+      step the world by dt, returns the collusions of the last resolve pass (eg. to draw the contact points)
+    """
+    bodies = self.begin_step()
+
+    self.store.save_previous()
+    rows = self.store.rows(bodies)
+
+    # delete all forces
+    self.store.clear_forces(rows)
+
+    # apply forces (gravity, ...)
+    self.forces.apply(self.store, rows)
+    
+    # free body update, of the bodies update_unconstrained would move
+    moving = self.store.rows([b for b in bodies if b.mass > 0 and not b.resting and not b.is_being_dragged])
+    self.store.integrate(moving, dt)
+      
+    # resolve collusions
+    if self.solver:
+      collusions = self.resolve_collusions_sequential(self.solver)
+    else:
+      collusions = self.resolve_collusions_advanced(self.config.solver_iterations, dt)
+
+    self.end_step(bodies, dt)
+    return collusions
@@ -0,0 +1,61 @@
+class IndexedMaxHeap:
+  """
+    max-heap over the items 0 .. n-1, where the key of any item can be changed in O(log n) \n
+    ties go to the smaller item, so top() is the first item with the largest key
+    (the same one a linear scan with a strict > would pick)
+  """
+  def __init__(self, keys: list[float]) -> None:
+    self.keys = list(keys)
+    self.heap = list(range(len(keys)))
+    # pos[item]: index of item in heap
+    self.pos = list(range(len(keys)))
+    for i in reversed(range(len(self.heap) // 2)):
+      self.sift_down(i)
+
+  def __len__(self):
+    return len(self.heap)
+
+  def before(self, a: int, b: int) -> bool:
+    """
+      true if item a should be closer to the top than item b
+    """
+    return self.keys[a] > self.keys[b] or (self.keys[a] == self.keys[b] and a < b)
+
+  def swap(self, i: int, j: int):
+    heap = self.heap
+    heap[i], heap[j] = heap[j], heap[i]
+    self.pos[heap[i]] = i
+    self.pos[heap[j]] = j
+
+  def sift_up(self, i: int):
+    while i > 0:
+      parent = (i - 1) // 2
+      if not self.before(self.heap[i], self.heap[parent]):
+        break
+      self.swap(i, parent)
+      i = parent
+
+  def sift_down(self, i: int):
+    n = len(self.heap)
+    while True:
+      best = i
+      for child in (2*i + 1, 2*i + 2):
+        if child < n and self.before(self.heap[child], self.heap[best]):
+          best = child
+      if best == i:
+        break
+      self.swap(i, best)
+      i = best
+
+  def top(self) -> tuple[int, float]:
+    """
+      (item, key) with the largest key
+    """
+    item = self.heap[0]
+    return (item, self.keys[item])
+
+  def update(self, item: int, key: float):
+    self.keys[item] = key
+    i = self.pos[item]
+    self.sift_up(i)
+    self.sift_down(self.pos[item])
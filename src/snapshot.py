@@ -0,0 +1,119 @@
+import math
+from dataclasses import dataclass
+import numpy as np
+from pygame.math import Vector2
+from body_store import BodyStore
+from classes import Polygon
+from contacts import FeatureKey
+from islands import Island
+
+# columns of the state array, one row per body
+# from the store: pos, rot, vel, ang_vel, acc, ang_acc, prev_pos, prev_rot, mass, inertia
+# from the body (rest detection): prev_center_of_mass, prev_rotational_displacement (nan when None), begin_pos,
+# begin_rot, current_run, might_be_resting, resting, sleeping
+STATE_COLUMNS = 24
+
+@dataclass
+class WorldSnapshot:
+  """
+    physics state of a PhysicsWorld at one point in time, see PhysicsWorld.snapshot \n
+    state: the state array of the bodies (STATE_COLUMNS float64 per body) as bytes \n
+    bodies: the bodies themselves, for their shapes (which never change) \n
+    the islands and impulses are never modified once made, so they are shared, not copied \n
+    pickling saves the shapes (body_id and local points) instead of the bodies, and unpickling makes new bodies from them
+  """
+  state: bytes
+  bodies: tuple[Polygon, ...]
+  id_gen: int
+  timer: float
+  sleeping_islands: tuple[Island, ...]
+  impulses: dict[FeatureKey, list[float]] | None
+
+  def __getstate__(self):
+    position = {b: i for (i, b) in enumerate(self.bodies)}
+    return {
+      'state': self.state,
+      'ids': np.array([b.body_id for b in self.bodies], dtype=np.int64).tobytes(),
+      'sizes': np.array([len(b.points_local) for b in self.bodies], dtype=np.int64).tobytes(),
+      'points': np.array([(p.x, p.y) for b in self.bodies for p in b.points_local]).tobytes(),
+      'id_gen': self.id_gen,
+      'timer': self.timer,
+      # bodies of each island, as positions in bodies
+      'islands': [([position[b] for b in island.bodies], island.aabb) for island in self.sleeping_islands],
+      'impulses': self.impulses,
+    }
+
+  def __setstate__(self, saved: dict):
+    ids = np.frombuffer(saved['ids'], dtype=np.int64).tolist()
+    sizes = np.frombuffer(saved['sizes'], dtype=np.int64).tolist()
+    points = np.frombuffer(saved['points']).reshape(-1, 2).tolist()
+    masses = np.frombuffer(saved['state']).reshape(len(ids), STATE_COLUMNS)[:, 12].tolist()
+    bodies: list[Polygon] = []
+    start = 0
+    for (body_id, size, mass) in zip(ids, sizes, masses):
+      local = [Vector2(p) for p in points[start:start + size]]
+      start += size
+      b = Polygon(local, body_id, mass < 0)
+      # exactly the saved points, Polygon would center them again
+      b.set_shape(local)
+      bodies.append(b)
+    self.state = saved['state']
+    self.bodies = tuple(bodies)
+    self.id_gen = saved['id_gen']
+    self.timer = saved['timer']
+    self.sleeping_islands = tuple(Island([bodies[i] for i in members], aabb) for (members, aabb) in saved['islands'])
+    self.impulses = saved['impulses']
+
+def pack_state(store: BodyStore, bodies: list[Polygon]) -> bytes:
+  rows = store.rows(bodies)
+  state = np.empty((len(bodies), STATE_COLUMNS))
+  state[:, 0:2] = store.pos[rows]
+  state[:, 2] = store.rot[rows]
+  state[:, 3:5] = store.vel[rows]
+  state[:, 5] = store.ang_vel[rows]
+  state[:, 6:8] = store.acc[rows]
+  state[:, 8] = store.ang_acc[rows]
+  state[:, 9:11] = store.prev_pos[rows]
+  state[:, 11] = store.prev_rot[rows]
+  state[:, 12] = store.mass[rows]
+  state[:, 13] = store.inertia[rows]
+  state[:, 14:24] = [
+    (
+      *(b.prev_center_of_mass if b.prev_center_of_mass is not None else (math.nan, math.nan)),
+      b.prev_rotational_displacement if b.prev_rotational_displacement is not None else math.nan,
+      b.begin_pos.x, b.begin_pos.y, b.begin_rot, b.current_run, b.might_be_resting, b.resting, b.sleeping
+    )
+    for b in bodies
+  ]
+  return state.tobytes()
+
+def unpack_state(store: BodyStore, bodies: list[Polygon], data: bytes, world_index: int = 0):
+  """
+    write the state array back into the rows of 'bodies' and the bodies themselves
+  """
+  state = np.frombuffer(data).reshape(len(bodies), STATE_COLUMNS)
+  rows = store.rows(bodies)
+  store.pos[rows] = state[:, 0:2]
+  store.rot[rows] = state[:, 2]
+  store.vel[rows] = state[:, 3:5]
+  store.ang_vel[rows] = state[:, 5]
+  store.acc[rows] = state[:, 6:8]
+  store.ang_acc[rows] = state[:, 8]
+  store.prev_pos[rows] = state[:, 9:11]
+  store.prev_rot[rows] = state[:, 11]
+  store.mass[rows] = state[:, 12]
+  store.inertia[rows] = state[:, 13]
+  # same as the RigidBody setters
+  store.inv_mass[rows] = np.where(state[:, 12] > 0, 1 / np.where(state[:, 12] > 0, state[:, 12], 1), 0)
+  store.inv_inertia[rows] = np.where(state[:, 13] > 0, 1 / np.where(state[:, 13] > 0, state[:, 13], 1), 0)
+  store.world[rows] = world_index
+  for (b, row) in zip(bodies, state[:, 14:24].tolist()):
+    (px, py, prot, bx, by, brot, run, might_be_resting, resting, sleeping) = row
+    b.prev_center_of_mass = Vector2(px, py) if not math.isnan(px) else None
+    b.prev_rotational_displacement = prot if not math.isnan(prot) else None
+    b.begin_pos = Vector2(bx, by)
+    b.begin_rot = brot
+    b.current_run = int(run)
+    b.might_be_resting = bool(might_be_resting)
+    b.resting = bool(resting)
+    b.sleeping = bool(sleeping)
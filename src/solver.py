@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from pygame.math import Vector2
+from collusion import CollusionData, apply_impulse, recalculate_penetration, resolve_penetration
+from constants import COE
+from contacts import ContactCache, contact_key
+from helper import rot_90_ac
+
+@dataclass
+class ContactPoint:
+  """
+    one clipped contact point of a collusion, with everything the solver needs precomputed \n
+    ra_n, rb_n: (perpendicular of the lever arm) . normal, for objA and objB \n
+    mass: effective mass along the normal \n
+    target: separating velocity the contact should end with (restitution) \n
+    impulse: total impulse applied at this point this step, never negative
+  """
+  collusion: CollusionData
+  point: Vector2
+  ra_n: float
+  rb_n: float
+  mass: float
+  target: float
+  impulse: float = 0
+
+def make_contact_point(collusion_data: CollusionData, p: Vector2, coe: float = COE) -> ContactPoint:
+  objA = collusion_data.objA
+  objB = collusion_data.objB
+  n = collusion_data.collusion_normal
+  ra_n = rot_90_ac(p - objA.center_of_mass).dot(n)
+  rb_n = rot_90_ac(p - objB.center_of_mass).dot(n)
+  inv_mass = 0.0
+  if objA.mass > 0:
+    inv_mass += 1 / objA.mass + ra_n * ra_n / objA.rotational_inertia
+  if objB.mass > 0:
+    inv_mass += 1 / objB.mass + rb_n * rb_n / objB.rotational_inertia
+  contact = ContactPoint(collusion_data, p, ra_n, rb_n, 1 / inv_mass if inv_mass > 0 else 0, 0)
+  # bounce off with coe of the approaching velocity, from before any impulse is applied
+  contact.target = -coe * min(normal_velocity(contact), 0)
+  return contact
+
+def normal_velocity(contact: ContactPoint) -> float:
+  """
+    separating velocity at the contact point, negative if the bodies approach each other
+  """
+  objA = contact.collusion.objA
+  objB = contact.collusion.objB
+  n = contact.collusion.collusion_normal
+  return objA.linear_velocity.dot(n) + objA.rotational_velocity * contact.ra_n \
+    - objB.linear_velocity.dot(n) - objB.rotational_velocity * contact.rb_n
+
+class SequentialImpulseSolver:
+  """
+    sweeps every contact point in a fixed number of passes, each pass is linear in the number of contacts \n
+    each point keeps its accumulated impulse, clamped to stay >= 0, so a later pass can take back
+    what an earlier pass applied too much (unlike resolving one worst contact at a time)
+  """
+  def __init__(self, iterations: int = 10) -> None:
+    """
+      iterations: number of passes over all contacts, for velocities and for penetration
+    """
+    self.iterations = iterations
+
+  def solve(self, collusions: list[CollusionData], cache: ContactCache | None = None, coe: float = COE):
+    """
+      coe: coefficient of restitution
+    """
+    contacts: list[list[ContactPoint]] = []
+    for col in collusions:
+      contacts.append([make_contact_point(col, p, coe) for p in col.contact_points])
+
+    # warm start
+    if cache:
+      cache.begin_step()
+      for (col, points) in zip(collusions, contacts):
+        for (contact, impulse) in zip(points, cache.warm_start(contact_key(col), len(points))):
+          contact.impulse = impulse
+          apply_impulse(col, impulse, contact.point)
+
+    for _ in range(self.iterations):
+      for points in contacts:
+        for contact in points:
+          impulse = (contact.target - normal_velocity(contact)) * contact.mass
+          total = max(contact.impulse + impulse, 0)
+          apply_impulse(contact.collusion, total - contact.impulse, contact.point)
+          contact.impulse = total
+
+    if cache:
+      for (col, points) in zip(collusions, contacts):
+        cache.store(contact_key(col), [c.impulse for c in points])
+      cache.end_step()
+
+    for _ in range(self.iterations):
+      for col in collusions:
+        if recalculate_penetration(col) > 0:
+          resolve_penetration(col)
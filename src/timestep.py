@@ -0,0 +1,34 @@
+class FixedTimestep:
+  """
+    turns real frame times into a number of fixed physics steps \n
+    time left over is carried to the next frame, so the simulation runs at real speed
+    whatever the frame rate, as long as it can keep up
+  """
+  def __init__(self, rate: float = 60, max_steps: int = 8) -> None:
+    """
+      rate: physics steps per second \n
+      max_steps: most steps run for one frame. If a frame needs more, the simulation slows down
+      instead of falling further and further behind
+    """
+    self.dt = 1 / rate
+    self.max_steps = max_steps
+    self.accumulator = 0.0
+
+  def advance(self, frame_time: float) -> int:
+    """
+      number of steps of length dt to run for a frame that took frame_time seconds
+    """
+    self.accumulator += frame_time
+    # small tolerance, so 2 * dt of frame time isn't 1.999... steps
+    steps = min(int(self.accumulator / self.dt + 1E-9), self.max_steps)
+    self.accumulator -= steps * self.dt
+    if steps == self.max_steps:
+      # behind, drop the backlog
+      self.accumulator = min(self.accumulator, self.dt)
+    return steps
+
+  def alpha(self) -> float:
+    """
+      time left over in the accumulator, as a fraction of a step (for interpolated drawing)
+    """
+    return min(max(self.accumulator / self.dt, 0), 1)
@@ -11,7 +11,6 @@ from collections.abc import Callable
 from engine import Engine
 from helper import to_tuple
 from ui_lib2 import ButtonWith, Container, Expr, MySurface, PositionedUINode, UIEngine, UINode, MouseEvent
-pygame.init()
 
 
 
@@ -287,6 +286,7 @@ class UILayer:
   
   # for debugging, draw only UI layer
   def play(self):
+    pygame.init()
     self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     self.clock = pygame.time.Clock()
     self.running = True
@@ -8,7 +8,7 @@ from pygame import Rect, Surface, Vector2
 import pygame
 
 from common import StateManager
-from helper import to_tuple
+from helper import AlphaColor, lighten, to_tuple
 
 @dataclass
 class MouseEvent:
@@ -177,7 +177,6 @@ class InfiniteSurface:
 
 
 T3 = TypeVar('T3', bound='UINode')
-AlphaColor = tuple[int, int, int, int]
 
 class UINode(ABC):
   def __init__(self,
@@ -315,10 +314,6 @@ class UINode(ABC):
         attr_val.cache_clear()
 
 
-def lighten(color: AlphaColor, amount: int) -> AlphaColor:
-  new_color = [min(a + amount, 255) for a in color]
-  new_color[3] = 255
-  return tuple(new_color) # type: ignore
 
 
 T2 = TypeVar('T2', bound='UINode')
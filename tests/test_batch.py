@@ -0,0 +1,35 @@
+import sys
+import os
+import json
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from batch import main, run_scenes
+
+def write_scene(path, x: float):
+  scene = {
+    'bodies': [
+      {'points': [[0, 0], [1000, 0], [1000, 50], [0, 50]], 'immovable': True},
+      {'points': [[x, 100], [x + 100, 100], [x + 100, 200], [x, 200]], 'velocity': [0, -10]},
+    ]
+  }
+  path.write_text(json.dumps(scene))
+  return str(path)
+
+def test_run_scenes(tmp_path):
+  paths = [write_scene(tmp_path / f'{i}.json', 100 * i) for i in range(3)]
+  results = run_scenes(paths, 120, 1/60, processes=2)
+  assert [r['scene'] for r in results] == paths
+  for (i, r) in enumerate(results):
+    assert r['steps'] == 120 and r['mean_step_ms'] > 0
+    (floor, box) = r['bodies']
+    assert floor['position'] == [500, 25]
+    # fell onto the floor
+    assert abs(box['position'][0] - (100 * i + 50)) < 1
+    assert abs(box['position'][1] - 100) < 1
+
+def test_main_writes_output(tmp_path):
+  scene = write_scene(tmp_path / 'scene.json', 0)
+  out = tmp_path / 'out.json'
+  main([scene, '--steps', '5', '--processes', '1', '--output', str(out)])
+  results = json.loads(out.read_text())
+  assert len(results) == 1 and results[0]['steps'] == 5
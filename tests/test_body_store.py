@@ -0,0 +1,88 @@
+import sys
+import os
+import math
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from pygame.math import Vector2
+from body_store import BodyStore
+from classes import Polygon
+from common import StateManager
+from constants import GRAVITY
+from engine import Engine
+from helper import get_square
+from test_helper import vector_list_isclose
+
+def test_polygon_is_a_view_into_the_store():
+  store = BodyStore(2)
+  bodies = [Polygon(get_square(Vector2(i * 200, 0), 100), i, i == 0, store) for i in range(5)]
+  # grew past the initial capacity
+  assert store.count == 5 and len(store.rot) >= 5
+  b = bodies[3]
+  assert store.pos[3].tolist() == [650, 50]
+  b.center_of_mass += Vector2(1, 2)
+  b.linear_velocity = Vector2(3, 4)
+  b.rotational_velocity = 0.5
+  assert store.pos[3].tolist() == [651, 52]
+  assert store.vel[3].tolist() == [3, 4]
+  assert store.ang_vel[3] == 0.5
+  store.pos[3] = (10, 20)
+  assert b.center_of_mass == Vector2(10, 20)
+  assert b.get_aabb_global() == (-40, -30, 60, 70)
+  # immovable bodies have no inverse mass
+  assert bodies[0].mass == -1 and store.inv_mass[0] == 0 and store.inv_inertia[0] == 0
+  assert store.inv_mass[3] == 1 / b.mass
+
+def test_store_compact():
+  store = BodyStore()
+  bodies = [Polygon(get_square(Vector2(i * 200, 0), 100), i, False, store) for i in range(4)]
+  keep = [bodies[3], bodies[1]]
+  store.compact(keep)
+  assert store.count == 2
+  assert [b.index for b in keep] == [0, 1]
+  assert keep[0].center_of_mass == Vector2(650, 50)
+  assert keep[1].center_of_mass == Vector2(250, 50)
+
+def test_own_store():
+  a = Polygon(get_square(Vector2(0, 0), 10), 0)
+  b = Polygon(get_square(Vector2(0, 0), 10), 1)
+  assert a.store is not b.store
+  a.center_of_mass = Vector2(1, 1)
+  assert b.center_of_mass == Vector2(5, 5)
+
+def test_engine_integrates_only_free_bodies():
+  engine = Engine(StateManager())
+  floor = engine.add_polygonal_body(get_square(Vector2(0, 0), 100), True)
+  free = engine.add_polygonal_body(get_square(Vector2(200, 500), 100))
+  resting = engine.add_polygonal_body(get_square(Vector2(400, 500), 100))
+  resting.resting = True
+  dragged = engine.add_polygonal_body(get_square(Vector2(600, 500), 100))
+  dragged.is_being_dragged = True
+  free.rotational_velocity = 1
+  engine.update(1/60)
+  # semi-implicit euler: velocity first, then position with the new velocity
+  assert free.linear_velocity == Vector2(0, -GRAVITY / 60)
+  assert free.center_of_mass == Vector2(250, 550) + free.linear_velocity / 60
+  assert free.rotational_displacement == 1 / 60
+  for b in (floor, resting, dragged):
+    assert b.linear_velocity == Vector2(0, 0)
+  assert resting.center_of_mass == Vector2(450, 550)
+  assert dragged.center_of_mass == Vector2(650, 550)
+
+def square_at(com: Vector2, rot: float):
+  b = Polygon(get_square(Vector2(0, 0), 100), 0)
+  b.center_of_mass = com
+  b.rotational_displacement = rot
+  return list(b.get_points_global())
+
+def test_interpolated_points():
+  engine = Engine(StateManager())
+  b = engine.add_polygonal_body(get_square(Vector2(0, 500), 100))
+  assert b.get_points_interpolated(0) == b.get_points_global()
+  b.rotational_displacement = 2 * math.pi - 0.1
+  b.linear_velocity = Vector2(60, 0)
+  b.rotational_velocity = 12
+  engine.update(1/60)
+  assert vector_list_isclose(b.get_points_interpolated(0), square_at(Vector2(50, 550), 2 * math.pi - 0.1))
+  assert vector_list_isclose(b.get_points_interpolated(1), list(b.get_points_global()))
+  # halfway, going the short way round past 0
+  assert vector_list_isclose(b.get_points_interpolated(0.5), square_at((Vector2(50, 550) + b.center_of_mass) / 2, 0))
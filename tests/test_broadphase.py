@@ -0,0 +1,84 @@
+import sys
+import os
+import random
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from pygame.math import Vector2
+from classes import Polygon
+from broadphase import BruteForce, DynamicAABBTree, SpatialHashGrid, SweepAndPrune, aabb_overlap
+from helper import get_square
+
+def random_bodies(n: int, seed: int = 0):
+  rng = random.Random(seed)
+  bodies: list[Polygon] = []
+  for i in range(n):
+    b = Polygon(get_square(Vector2(rng.uniform(0, 1000), rng.uniform(0, 600)), rng.randint(20, 100)), i)
+    b.rotational_displacement = rng.uniform(0, 3)
+    bodies.append(b)
+  return bodies
+
+def expected_pairs(bodies: list[Polygon], margin: float = 0):
+  return {
+    (a.body_id, b.body_id) for (a, b) in BruteForce().get_pairs(bodies)
+    if aabb_overlap(a.get_aabb_global(), b.get_aabb_global(), margin)
+  }
+
+def pair_ids(pairs: list[tuple[Polygon, Polygon]]):
+  return {(a.body_id, b.body_id) for (a, b) in pairs}
+
+def test_sweep_and_prune_matches_brute_force():
+  bodies = random_bodies(60)
+  sap = SweepAndPrune()
+  assert pair_ids(sap.get_pairs(bodies)) == expected_pairs(bodies)
+  assert pair_ids(sap.get_pairs(bodies, 7)) == expected_pairs(bodies, 7)
+
+  # move things around, the sorted order is reused
+  rng = random.Random(1)
+  for b in bodies:
+    b.center_of_mass += Vector2(rng.uniform(-50, 50), rng.uniform(-50, 50))
+  assert pair_ids(sap.get_pairs(bodies)) == expected_pairs(bodies)
+
+def test_sweep_and_prune_bodies_added_and_removed():
+  bodies = random_bodies(30)
+  sap = SweepAndPrune()
+  sap.get_pairs(bodies)
+  bodies = bodies[10:] + random_bodies(5, seed=2)
+  assert pair_ids(sap.get_pairs(bodies)) == expected_pairs(bodies)
+  assert len(sap.order) == len(bodies)
+
+def test_spatial_hash_grid_matches_brute_force():
+  bodies = random_bodies(60)
+  for cell_size in [25, 100, 1000]:
+    pairs = SpatialHashGrid(cell_size).get_pairs(bodies)
+    assert len(pairs) == len(pair_ids(pairs)) # no duplicates
+    assert pair_ids(pairs) == expected_pairs(bodies)
+    assert pair_ids(SpatialHashGrid(cell_size).get_pairs(bodies, 7)) == expected_pairs(bodies, 7)
+
+def test_aabb_tree_pairs():
+  bodies = random_bodies(60)
+  tree = DynamicAABBTree()
+  # the tree may give extra pairs from the fattened boxes, but never misses one
+  assert pair_ids(tree.get_pairs(bodies)) >= expected_pairs(bodies)
+  assert pair_ids(tree.get_pairs(bodies, 7)) >= expected_pairs(bodies, 7)
+  assert pair_ids(tree.get_pairs(bodies, 30)) >= expected_pairs(bodies, 30)
+
+  # small movements stay inside the fattened boxes
+  for b in bodies:
+    b.center_of_mass += Vector2(1, -1)
+  assert not any(tree.update(b) for b in bodies)
+
+  rng = random.Random(1)
+  for b in bodies:
+    b.center_of_mass += Vector2(rng.uniform(-50, 50), rng.uniform(-50, 50))
+  bodies = bodies[5:]
+  assert pair_ids(tree.get_pairs(bodies)) >= expected_pairs(bodies)
+  assert len(tree.leaves) == len(bodies)
+
+def test_aabb_tree_queries():
+  bodies = random_bodies(40)
+  tree = DynamicAABBTree()
+  tree.get_pairs(bodies)
+  region = (200, 200, 500, 400)
+  assert {b.body_id for b in tree.query_region(region)} == {b.body_id for b in bodies if aabb_overlap(b.get_aabb_global(), region)}
+  b = bodies[7]
+  assert b in tree.query_point(b.center_of_mass)
@@ -11,7 +11,10 @@ from classes import Polygon
 from collusion import *
 from engine import *
 from helper import *
+import collusion
+from test_helper import vector_list_isclose
 import pickle
+import math
 
 def test_one_square_one_immovable():
   # test polygon rebounding against a square
@@ -103,5 +106,69 @@ def test_thres_le_0():
   cd2 = collide(a, b, True)
   pass
   
+def test_transform_cache():
+  a = Polygon(get_square(Vector2(0, 0), 10), 0)
+  points = a.get_points_global()
+  assert a.get_points_global() is points # unchanged, so cached
+  assert a.get_aabb_global() == (0, 0, 10, 10)
+
+  a.center_of_mass += Vector2(5, 0)
+  assert a.get_points_global() is not points
+  assert a.get_aabb_global() == (5, 0, 15, 10)
+
+  a.rotational_displacement = math.pi / 2
+  expected = [p.rotate_rad(math.pi / 2) + a.center_of_mass for p in a.points_local]
+  for (p, e) in zip(a.get_points_global(), expected):
+    assert (p - e).length() < 1e-9
+  
+def test_separating_axis_cache():
+  a = Polygon([Vector2(0, 0), Vector2(10, 0), Vector2(0, 10)], 0)
+  b = Polygon(get_square(Vector2(6, 6), 10), 1)
+  cache = SeparatingAxisCache()
+  # bounding boxes overlap, separated along the long edge of the triangle
+  assert collide(a, b, axis_cache=cache) == None
+  assert cache.get((0, 1, False)) == (0, 1)
+
+  b.center_of_mass += Vector2(-3, -3)
+  assert collide(a, b, axis_cache=cache) != None
+  assert cache.get((0, 1, False)) == None
+
+  b.center_of_mass += Vector2(3, 3)
+  assert collide(a, b, axis_cache=cache) == None
+  cache.end_step()
+  assert cache.get((0, 1, False)) == (0, 1)
+  # unused for a step
+  cache.end_step()
+  assert cache.get((0, 1, False)) == None
+  
+def regular_polygon(sides: int, center: Vector2, r: float, body_id: int, a0: float = 0):
+  return Polygon([center + Vector2(r*math.cos(a0 + 2*math.pi*k/sides), r*math.sin(a0 + 2*math.pi*k/sides)) for k in range(sides)], body_id)
+
+def test_collide_gjk_matches_sat():
+  # shallow contacts between many sided polygons
+  for (gap, angle) in [(-2, 0.1), (-5, 0.7), (-3, 2.0)]:
+    a = regular_polygon(20, Vector2(0, 0), 50, 0)
+    b = regular_polygon(12, Vector2(100 + gap, 10), 50, 1, angle)
+    # force the separating axis test
+    old_threshold = collusion.GJK_VERTEX_THRESHOLD
+    collusion.GJK_VERTEX_THRESHOLD = 1000
+    sat = cast(CollusionData, collide(a, b))
+    collusion.GJK_VERTEX_THRESHOLD = old_threshold
+    assert len(a.points_local) + len(b.points_local) > old_threshold
+    gjk_res = cast(CollusionData, collide(a, b))
+    assert gjk_res.objA is sat.objA
+    assert (gjk_res.collusion_normal - sat.collusion_normal).length() < 1e-9
+    assert math.isclose(gjk_res.penetration_depth, sat.penetration_depth, abs_tol=1e-9)
+    assert vector_list_isclose(gjk_res.contact_points, sat.contact_points)
+
+def test_collide_gjk_separated():
+  a = regular_polygon(20, Vector2(0, 0), 50, 0)
+  b = regular_polygon(20, Vector2(103, 0), 50, 1)
+  assert collide_gjk(a, b) == None
+  # 3 apart, close enough to be touching
+  assert collide_gjk(a, b, True) != None
+  b.center_of_mass += Vector2(10, 0)
+  assert collide_gjk(a, b, True) == None
+  
 if __name__ == '__main__':
   test_thres_le_0()
\ No newline at end of file
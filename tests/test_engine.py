@@ -0,0 +1,104 @@
+import sys
+import os
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+import math
+from pygame.math import Vector2
+from classes import Polygon
+from collusion import collide
+from common import StateManager
+from config import PhysicsConfig
+from contacts import ContactCache
+from engine import Engine
+from helper import get_square
+
+def stack_scene(**kwargs):
+  """
+    floor with a 2 x 3 stack of boxes, falling from a little above it
+  """
+  engine = Engine(StateManager(), **kwargs)
+  engine.add_polygonal_body([Vector2(50, 50), Vector2(1450, 50), Vector2(1450, 100), Vector2(50, 100)], True)
+  for i in range(2):
+    for j in range(3):
+      engine.add_polygonal_body(get_square(Vector2(400 + i*110, 110 + j*101), 100))
+  return engine
+
+def test_contact_cache_warm_start():
+  cache = ContactCache(warm_start_factor=0.5)
+  key = (0, 1, 2)
+  assert cache.warm_start(key, 2) == [0, 0]
+  cache.begin_step()
+  cache.store(key, [4, 2])
+  cache.end_step()
+  assert cache.warm_start(key, 2) == [2, 1]
+  # contact points changed, share the total
+  assert cache.warm_start(key, 1) == [3]
+  # not seen for a step, so dropped
+  cache.begin_step()
+  cache.end_step()
+  assert cache.warm_start(key, 2) == [0, 0]
+
+def test_warm_starting_keeps_contacts():
+  engine = stack_scene(warm_starting=True)
+  for _ in range(40):
+    engine.update(1/60)
+  assert engine.contact_cache
+  assert len(engine.contact_cache.impulses) > 0
+  assert all(imp >= 0 for imps in engine.contact_cache.impulses.values() for imp in imps)
+  # the stack stays on the floor
+  for b in engine.bodies[1:]:
+    assert b.center_of_mass.y > 100
+
+def test_feature_key_is_stable():
+  floor = Polygon([Vector2(0, 0), Vector2(500, 0), Vector2(500, 50), Vector2(0, 50)], 0, True)
+  box = Polygon(get_square(Vector2(200, 48), 100), 1)
+  keys = set()
+  for rot in [0.001, -0.001]:
+    # a different bottom corner is the deepest
+    box.rotational_displacement = rot % (2*math.pi)
+    for c in [collide(box, floor), collide(floor, box)]:
+      assert c
+      keys.add(c.feature_key)
+      assert c.contact_points[0].x > c.contact_points[1].x
+  assert keys == {(0, 2, 1)}
+
+  # same key whichever box gives the reference edge
+  lower = Polygon(get_square(Vector2(200, 100), 100), 2)
+  upper = Polygon(get_square(Vector2(200, 198), 100), 3)
+  c1 = collide(lower, upper)
+  lower.rotational_displacement = 0.001
+  c2 = collide(lower, upper)
+  assert c1 and c2 and c1.objB is lower and c2.objB is upper
+  assert c1.feature_key == c2.feature_key == (2, 2, 3)
+  assert c1.contact_points[0].x > c1.contact_points[1].x and c2.contact_points[0].x > c2.contact_points[1].x
+
+def test_warm_starting_needs_fewer_iterations():
+  def rest(engine: Engine):
+    for _ in range(300):
+      engine.update(1/60)
+    assert all(b.resting for b in engine.bodies)
+    return [b.center_of_mass for b in engine.bodies]
+  cold = rest(stack_scene())
+  warm = rest(stack_scene(warm_starting=True, config=PhysicsConfig(solver_iterations=3)))
+  assert all(a.distance_to(b) < 0.1 for (a, b) in zip(cold, warm))
+
+def test_island_sleeping():
+  engine = stack_scene(island_sleeping=True)
+  for _ in range(400):
+    engine.update(1/60)
+  # the columns are 10 apart, so each is an island of its own
+  assert len(engine.sleeping_islands) == 2
+  assert engine.get_awake_bodies() == engine.bodies[:1]
+  positions = [Vector2(b.center_of_mass) for b in engine.bodies]
+  engine.update(1/60)
+  assert [b.center_of_mass for b in engine.bodies] == positions
+
+  # far away boxes wake nothing
+  engine.add_polygonal_body(get_square(Vector2(1200, 500), 100))
+  engine.update(1/60)
+  assert len(engine.sleeping_islands) == 2
+
+  # dropping a box on the left column wakes it
+  engine.add_polygonal_body(get_square(Vector2(350, 380), 100))
+  engine.update(1/60)
+  assert not any(b.sleeping for b in engine.bodies[1:4])
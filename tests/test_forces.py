@@ -0,0 +1,59 @@
+import sys
+import os
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from pygame.math import Vector2
+from classes import ConstantForceGenerator
+from common import StateManager
+from constants import GRAVITY
+from engine import Engine
+from helper import get_square
+
+def test_constant_forces_batched():
+  engine = Engine(StateManager())
+  floor = engine.add_polygonal_body(get_square(Vector2(0, 0), 100), True)
+  a = engine.add_polygonal_body(get_square(Vector2(200, 500), 100))
+  b = engine.add_polygonal_body(get_square(Vector2(400, 500), 50))
+  gens = [ConstantForceGenerator(a, Vector2(100, 0)), ConstantForceGenerator(a, Vector2(0, 50)), ConstantForceGenerator(b, Vector2(-10, 0)), ConstantForceGenerator(floor, Vector2(1, 1))]
+  for g in gens:
+    engine.forces.add(g)
+
+  # same accelerations as applying them one by one
+  expected = {}
+  for body in engine.bodies:
+    body.linear_acceleration = Vector2(0, -GRAVITY) if body.mass > 0 else Vector2(0, 0)
+  for g in gens:
+    g.apply_forces()
+  for body in engine.bodies:
+    expected[body] = body.linear_acceleration
+  engine.update(1/60)
+  for body in engine.bodies:
+    assert body.linear_acceleration == expected[body]
+  assert set(engine.forces.timings) == {engine.gravity_generator, *gens}
+
+  # removed generators no longer apply
+  engine.forces.remove(gens[0])
+  engine.forces.remove(gens[1])
+  engine.update(1/60)
+  assert a.linear_acceleration == Vector2(0, -GRAVITY)
+
+def test_constant_forces_cache():
+  engine = Engine(StateManager())
+  a = engine.add_polygonal_body(get_square(Vector2(200, 500), 100))
+  b = engine.add_polygonal_body(get_square(Vector2(400, 500), 50))
+  g = ConstantForceGenerator(b, Vector2(100, 0))
+  engine.forces.add(g)
+  engine.update(1/60)
+  assert b.linear_acceleration == Vector2(100 / b.mass, -GRAVITY)
+
+  # a new force is picked up
+  g.force_vector = Vector2(0, 100)
+  engine.update(1/60)
+  assert b.linear_acceleration == Vector2(0, 100 / b.mass - GRAVITY)
+
+  # and so is a new row, once the bodies before b are removed
+  engine.bodies.remove(a)
+  engine.store.compact(engine.bodies)
+  assert b.index == 0
+  engine.update(1/60)
+  assert b.linear_acceleration == Vector2(0, 100 / b.mass - GRAVITY)
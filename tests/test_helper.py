@@ -5,7 +5,7 @@ import os
 # os.path.join: function to join 2 string paths
 root_dir = os.path.join(os.path.dirname(__file__), '../')
 sys.path.append(root_dir)
-from src.helper import area_of_polygon, center_of_mass, moment_inertia_of_polygon, clip
+from src.helper import area_of_polygon, center_of_mass, moment_inertia_of_polygon, clip, separating_axes
 from pygame.math import Vector2
 from math import isclose
 
@@ -151,5 +151,14 @@ def test_clip():
   exp = [Vector2(3, 2)]
   assert vector_list_isclose(res, exp, 1e-3)
 
+def test_separating_axes():
+  square = [Vector2(0, 0), Vector2(1, 0), Vector2(1, 1), Vector2(0, 1)]
+  normals, edges = separating_axes(square)
+  assert edges == [(0, 2), (1, 3)]
+  assert vector_isclose(normals[0], Vector2(0, -1))
+  assert vector_isclose(normals[1], Vector2(1, 0))
 
-
+  triangle = [Vector2(0, 0), Vector2(2, 0), Vector2(1, 2)]
+  normals, edges = separating_axes(triangle)
+  assert edges == [(0, -1), (1, -1), (2, -1)]
+  assert vector_isclose(normals[0], Vector2(0, -1))
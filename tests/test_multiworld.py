@@ -0,0 +1,63 @@
+import sys
+import os
+import pytest
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from pygame.math import Vector2
+from config import PhysicsConfig
+from helper import get_square
+from multiworld import WorldBatch
+from parallel import ParallelIslandSolver
+from physics import PhysicsWorld
+from solver import SequentialImpulseSolver
+
+def fill(world: PhysicsWorld, i: int):
+  """
+    floor and a few boxes, like the default Controller scene
+  """
+  world.add_polygonal_body([Vector2(50, 50), Vector2(1450, 50), Vector2(1450, 100), Vector2(50, 100)], True)
+  for j in range(3):
+    b = world.add_polygonal_body(get_square(Vector2(400 + 30 * i, 120 + j * 105), 100))
+    b.linear_velocity = Vector2(i - 2, 0)
+
+def test_batch_matches_separate_worlds():
+  configs = [PhysicsConfig(), PhysicsConfig(gravity=90), PhysicsConfig(coe=0), PhysicsConfig(solver_iterations=3), PhysicsConfig()]
+  batch = WorldBatch()
+  batched = [batch.add_world(config=c, warm_starting=(i == 4)) for (i, c) in enumerate(configs)]
+  separate = [PhysicsWorld(config=c, warm_starting=(i == 4)) for (i, c) in enumerate(configs)]
+  for (i, (a, b)) in enumerate(zip(batched, separate)):
+    fill(a, i)
+    fill(b, i)
+  assert batch.store.world[:batch.store.count].tolist() == [i for i in range(5) for _ in range(4)]
+
+  for _ in range(120):
+    batch.update(1/60)
+    for w in separate:
+      w.update(1/60)
+  for (a, b) in zip(batched, separate):
+    for (x, y) in zip(a.bodies, b.bodies):
+      assert x.center_of_mass == y.center_of_mass
+      assert x.linear_velocity == y.linear_velocity
+      assert x.rotational_displacement == y.rotational_displacement
+      assert x.resting == y.resting
+
+def test_batch_compact():
+  batch = WorldBatch()
+  worlds = [batch.add_world() for _ in range(3)]
+  for (i, w) in enumerate(worlds):
+    fill(w, i)
+  removed = [b for b in worlds[1].bodies if b.mass > 0]
+  worlds[1].remove_movable_bodies()
+  batch.compact()
+  # the removed bodies lost their rows, which now belong to the bodies of worlds[2]
+  assert all(b.index == -1 for b in removed)
+  assert batch.store.count == 4 + 1 + 4
+  assert batch.store.world[:batch.store.count].tolist() == [0] * 4 + [1] + [2] * 4
+  batch.update(1/60)
+
+def test_batch_rejects_parallel_solver():
+  batch = WorldBatch()
+  with pytest.raises(ValueError):
+    batch.add_world(solver=ParallelIslandSolver(SequentialImpulseSolver(4)))
+  assert batch.worlds == []
+  batch.add_world(solver=SequentialImpulseSolver(4))
@@ -0,0 +1,70 @@
+import sys
+import os
+import math
+import random
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from pygame.math import Vector2
+from classes import Polygon
+from helper import get_square
+from collusion import collide
+from narrowphase import collide_batch
+
+def random_pairs(n: int, seed: int = 0):
+  rng = random.Random(seed)
+  def regular_polygon(sides: int, center: Vector2, body_id: int):
+    r = rng.uniform(20, 60)
+    a0 = rng.uniform(0, 2*math.pi)
+    points = [center + Vector2(r*math.cos(a0 + 2*math.pi*k/sides), r*math.sin(a0 + 2*math.pi*k/sides)) for k in range(sides)]
+    b = Polygon(points, body_id)
+    b.rotational_displacement = rng.uniform(0, 2*math.pi)
+    return b
+  pairs: list[tuple[Polygon, Polygon]] = []
+  for i in range(n):
+    a = regular_polygon(rng.choice([3, 4, 5, 8]), Vector2(0, 0), 2*i)
+    b = regular_polygon(rng.choice([3, 4, 6]), Vector2(rng.uniform(-90, 90), rng.uniform(-90, 90)), 2*i + 1)
+    pairs.append((a, b))
+  return pairs
+
+def test_collide_batch_matches_collide():
+  pairs = random_pairs(500)
+  expected = [cd for cd in (collide(a, b) for (a, b) in pairs) if cd]
+  res = collide_batch(pairs)
+  assert len(res) == len(expected) > 0
+  for (r, e) in zip(res, expected):
+    assert r.objA is e.objA and r.objB is e.objB
+    assert r.collusion_normal == e.collusion_normal
+    assert math.isclose(r.penetration_depth, e.penetration_depth, abs_tol=1e-9)
+    assert r.contact_points == e.contact_points
+
+def test_collide_batch_empty():
+  assert collide_batch([]) == []
+
+def test_collide_batch_degenerate():
+  # coincident polygons have no valid normal, neither collide nor collide_batch gives a collusion
+  square = lambda body_id: Polygon(get_square(Vector2(0, 0), 100), body_id)
+  triangle = lambda body_id: Polygon([Vector2(0, 0), Vector2(60, 0), Vector2(0, 60)], body_id)
+  pairs = [(square(0), square(1)), (triangle(2), triangle(3)), (square(4), Polygon(get_square(Vector2(50, 0), 100), 5))]
+  for touch in (False, True):
+    expected = [collide(a, b, touch) for (a, b) in pairs]
+    assert expected[0] is None and expected[1] is None and expected[2]
+    res = collide_batch(pairs, touch)
+    assert len(res) == 1
+    assert res[0].objA is expected[2].objA and res[0].collusion_normal == expected[2].collusion_normal
+    assert res[0].contact_points == expected[2].contact_points
+
+def test_collide_batch_uses_gjk_for_large_pairs():
+  # 20 vertices in total, over GJK_VERTEX_THRESHOLD, so collide uses GJK / EPA for these pairs
+  def circle(center: Vector2, body_id: int):
+    return Polygon([center + Vector2(50*math.cos(2*math.pi*k/10), 50*math.sin(2*math.pi*k/10)) for k in range(10)], body_id)
+  # two axes tie at (90, 0), where GJK / EPA and the separating axis test pick different normals
+  pairs = [(circle(Vector2(0, 0), 0), circle(Vector2(90, 0), 1)), *random_pairs(20, 1), (circle(Vector2(0, 300), 2), circle(Vector2(0, 390), 3))]
+  for touch in (False, True):
+    expected = [cd for cd in (collide(a, b, touch) for (a, b) in pairs) if cd]
+    res = collide_batch(pairs, touch)
+    assert len(res) == len(expected)
+    for (r, e) in zip(res, expected):
+      assert r.objA is e.objA and r.objB is e.objB
+      assert r.collusion_normal == e.collusion_normal
+      assert r.penetration_depth == e.penetration_depth
+      assert r.contact_points == e.contact_points
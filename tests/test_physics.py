@@ -0,0 +1,190 @@
+import sys
+import os
+import pickle
+import subprocess
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from pygame.math import Vector2
+from helper import get_square
+from broadphase import BruteForce, DynamicAABBTree
+from classes import ConstantForceGenerator
+from config import PhysicsConfig
+import physics
+from collusion import collide
+from physics import PhysicsWorld
+
+def test_physics_is_headless():
+  code = (
+    "import sys, pygame, physics\n"
+    "assert not any(m in sys.modules for m in ('common', 'ui_lib2', 'ui2', 'engine', 'controller'))\n"
+    "assert not pygame.get_init() and not pygame.display.get_init()\n"
+  )
+  subprocess.run([sys.executable, '-c', code], cwd=root_dir, check=True)
+
+def test_physics_world_steps():
+  world = PhysicsWorld()
+  world.add_polygonal_body([Vector2(0, 0), Vector2(1000, 0), Vector2(1000, 50), Vector2(0, 50)], True)
+  box = world.add_polygonal_body(get_square(Vector2(100, 100), 100))
+  collusions = [world.update(1/60) for _ in range(100)]
+  # fell onto the floor
+  assert abs(box.center_of_mass.y - 100) < 1
+  # update gives the collusions it resolved last
+  hits = [c for cols in collusions for c in cols]
+  assert len(hits) > 0
+  assert all({c.objA, c.objB} == {box, world.bodies[0]} and len(c.contact_points) > 0 for c in hits)
+
+def test_worlds_with_different_configs():
+  def drop(config: PhysicsConfig):
+    world = PhysicsWorld(config=config)
+    world.add_polygonal_body([Vector2(0, 0), Vector2(1000, 0), Vector2(1000, 50), Vector2(0, 50)], True)
+    world.add_polygonal_body(get_square(Vector2(100, 300), 100))
+    return world
+  worlds = [drop(PhysicsConfig()), drop(PhysicsConfig(gravity=0)), drop(PhysicsConfig(resting_time=5/60))]
+  for _ in range(300):
+    for w in worlds:
+      w.update(1/60)
+  (default, floating, quick) = [w.bodies[1] for w in worlds]
+  assert abs(default.center_of_mass.y - 100) < 1
+  assert floating.center_of_mass == Vector2(150, 350)
+  assert quick.resting and quick.center_of_mass.y > 95
+
+def test_gravity_changed_after_construction():
+  world = PhysicsWorld()
+  box = world.add_polygonal_body(get_square(Vector2(100, 100), 100))
+  world.update(1/60)
+  assert box.linear_acceleration == Vector2(0, -world.config.gravity)
+  world.config.gravity = 30
+  world.update(1/60)
+  assert box.linear_acceleration == Vector2(0, -30)
+  world.gravity_generator.gravity = 0
+  world.update(1/60)
+  assert world.config.gravity == 0 and box.linear_acceleration == Vector2(0, 0)
+
+def test_rest_detection_at_higher_rates():
+  # the rest settings are per second, so a faster step rate doesn't freeze the box in the air
+  for rate in (60, 240):
+    world = PhysicsWorld()
+    floor = world.add_polygonal_body([Vector2(0, 0), Vector2(1000, 0), Vector2(1000, 100), Vector2(0, 100)], True)
+    box = world.add_polygonal_body(get_square(Vector2(100, 200), 100))
+    for _ in range(4 * rate):
+      world.update(1 / rate)
+    assert box.resting
+    assert abs(box.center_of_mass.y - 150) < 1
+    assert world.touching[box] == [floor]
+
+def test_resting_stack_keeps_touching(monkeypatch):
+  world = PhysicsWorld()
+  floor = world.add_polygonal_body([Vector2(0, 0), Vector2(1000, 0), Vector2(1000, 50), Vector2(0, 50)], True)
+  stack = [world.add_polygonal_body(get_square(Vector2(300, 52 + j * 102), 100)) for j in range(3)]
+  edges = {(floor, stack[0]), (stack[0], stack[1]), (stack[1], stack[2])}
+  def touching_edges():
+    return {(a, b) for a in world.bodies for b in world.touching.get(a, ()) if a.body_id < b.body_id}
+  for _ in range(300):
+    world.update(1/60)
+  assert all(b.resting for b in stack)
+  # the graph comes from the collision pass, no touch test is run for it
+  touch_tests = []
+  def counting_collide(a, b, touch=False, axis_cache=None):
+    touch_tests.append(touch)
+    return collide(a, b, touch, axis_cache)
+  monkeypatch.setattr(physics, 'collide', counting_collide)
+  # resting bodies don't move, so nothing is resolved, but the graph is built every step
+  for _ in range(20):
+    assert world.update(1/60) == []
+    assert touching_edges() == edges
+  assert len(touch_tests) > 0 and not any(touch_tests)
+
+def pile(**kwargs):
+  world = PhysicsWorld(**kwargs)
+  world.add_polygonal_body([Vector2(0, 0), Vector2(1000, 0), Vector2(1000, 50), Vector2(0, 50)], True)
+  for i in range(4):
+    for j in range(3):
+      b = world.add_polygonal_body(get_square(Vector2(200 + i * 90 + j * 20, 60 + j * 105), 80))
+      b.rotational_displacement = 0.1 * i
+  return world
+
+def test_deterministic_mode():
+  # the tree gives its pairs in set order, which depends on object identity
+  runs = []
+  for _ in range(2):
+    world = pile(broadphase=DynamicAABBTree(), deterministic=True)
+    for _ in range(60):
+      world.update(1/60)
+    runs.append([(b.center_of_mass, b.rotational_displacement, b.linear_velocity) for b in world.bodies])
+  assert runs[0] == runs[1]
+
+  pairs = world.find_pairs()
+  ids = [(a.body_id, b.body_id) for (a, b) in pairs]
+  assert ids == sorted(ids) and all(a < b for (a, b) in ids)
+
+def test_ids_unique_after_removing_bodies():
+  world = PhysicsWorld()
+  world.add_polygonal_body(get_square(Vector2(0, 0), 10))
+  world.add_polygonal_body(get_square(Vector2(0, 0), 10), True)
+  world.remove_movable_bodies()
+  assert world.add_polygonal_body(get_square(Vector2(0, 0), 10)).body_id == 2
+
+def test_snapshot_and_restore():
+  # quick to rest, so the pile goes to sleep after the snapshot
+  def make():
+    return pile(broadphase=DynamicAABBTree(), deterministic=True, warm_starting=True, island_sleeping=True, config=PhysicsConfig(resting_time=5/60))
+  def state(w: PhysicsWorld):
+    return [(b.body_id, b.center_of_mass, b.rotational_displacement, b.linear_velocity, b.rotational_velocity, b.resting, b.sleeping) for b in w.bodies]
+  def run(w: PhysicsWorld):
+    for _ in range(200):
+      w.update(1/60)
+    return state(w)
+  world = make()
+  for _ in range(100):
+    world.update(1/60)
+  snap = world.snapshot()
+  assert len(snap.state) == len(world.bodies) * 24 * 8
+  expected = run(world)
+  assert any(b.sleeping for b in world.bodies)
+
+  # stepping again from the snapshot gives the same result
+  world.restore(snap)
+  assert run(world) == expected
+
+  # bodies removed (and new ones added) since the snapshot come back
+  world.restore(snap)
+  world.remove_movable_bodies()
+  world.add_polygonal_body(get_square(Vector2(500, 500), 50))
+  world.restore(snap)
+  assert world.store.count == len(world.bodies) == 13
+  assert run(world) == expected
+
+  # pickled, it is the state and the shapes, not the bodies and their store
+  saved = pickle.dumps(snap)
+  assert len(saved) < 2 * len(snap.state)
+  other = PhysicsWorld(broadphase=DynamicAABBTree(), deterministic=True, warm_starting=True, island_sleeping=True, config=PhysicsConfig(resting_time=5/60))
+  other.restore(pickle.loads(saved))
+  assert run(other) == expected
+
+def test_deterministic_across_broadphases():
+  def run(broadphase):
+    world = pile(broadphase=broadphase, deterministic=True, warm_starting=True, island_sleeping=True)
+    for _ in range(120):
+      world.update(1/60)
+    return world
+  worlds = [run(BruteForce()), run(DynamicAABBTree())]
+  (brute, tree) = [[(b.center_of_mass, b.rotational_displacement, b.linear_velocity, b.rotational_velocity, b.resting) for b in w.bodies] for w in worlds]
+  assert brute == tree
+  for w in worlds:
+    for (b, others) in w.touching.items():
+      ids = [o.body_id for o in others]
+      assert ids == sorted(ids)
+  assert [[o.body_id for o in worlds[0].touching[b]] for b in worlds[0].bodies] == [[o.body_id for o in worlds[1].touching[b]] for b in worlds[1].bodies]
+
+def test_restore_drops_rows_of_later_bodies():
+  world = PhysicsWorld()
+  a = world.add_polygonal_body(get_square(Vector2(0, 0), 10))
+  saved = world.snapshot()
+  b = world.add_polygonal_body(get_square(Vector2(100, 0), 10))
+  world.restore(saved)
+  assert world.bodies == [a] and b.index == -1
+  c = world.add_polygonal_body(get_square(Vector2(200, 0), 10))
+  assert c.index != b.index
+  world.forces.add(ConstantForceGenerator(b, Vector2(1000, 0)))
+  world.update(1/60)
+  assert c.linear_acceleration == Vector2(0, -world.config.gravity)
@@ -0,0 +1,26 @@
+import sys
+import os
+import random
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from priority_queue import IndexedMaxHeap
+
+def linear_scan(keys: list[float]):
+  best = 0
+  for i in range(len(keys)):
+    if keys[i] > keys[best]:
+      best = i
+  return best
+
+def test_indexed_max_heap_matches_linear_scan():
+  rng = random.Random(0)
+  keys = [float(rng.randint(-10, 10)) for _ in range(50)]
+  heap = IndexedMaxHeap(keys)
+  assert heap.top() == (linear_scan(keys), max(keys))
+  for _ in range(500):
+    i = rng.randrange(len(keys))
+    keys[i] = float(rng.randint(-10, 10))
+    heap.update(i, keys[i])
+    # ties go to the first item, like the scan
+    assert heap.top() == (linear_scan(keys), max(keys))
+  assert len(heap) == len(keys)
@@ -0,0 +1,91 @@
+import sys
+import os
+import pickle
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from pygame.math import Vector2
+from classes import Polygon
+from collusion import collide, recalculate_penetration
+from helper import get_square
+from parallel import ParallelIslandSolver, pack_island, unpack_island
+from solver import SequentialImpulseSolver, make_contact_point, normal_velocity
+from test_engine import stack_scene
+
+def test_sequential_impulse_stops_falling_box():
+  floor = Polygon([Vector2(0, 0), Vector2(500, 0), Vector2(500, 50), Vector2(0, 50)], 0, True)
+  box = Polygon(get_square(Vector2(200, 48), 100), 1)
+  box.linear_velocity = Vector2(0, -30)
+  c = collide(box, floor)
+  assert c and len(c.contact_points) == 2
+  points = [make_contact_point(c, p) for p in c.contact_points]
+  assert all(p.target > 0 for p in points)
+
+  SequentialImpulseSolver(10).solve([c])
+  # both points bounce back with (close to) the restitution velocity, and no point pulls
+  assert all(normal_velocity(p) > 0 for p in points)
+  assert abs(box.rotational_velocity) < 1E-6
+  assert box.linear_velocity.y > 0
+  assert recalculate_penetration(c) < 1E-9
+
+def test_sequential_impulse_stack():
+  engine = stack_scene(solver=SequentialImpulseSolver(4), warm_starting=True)
+  for _ in range(300):
+    engine.update(1/60)
+  for b in engine.bodies[1:]:
+    assert b.resting
+    assert b.center_of_mass.y > 145
+
+def two_stacks(solver):
+  engine = stack_scene(solver=solver, warm_starting=True)
+  for j in range(3):
+    engine.add_polygonal_body(get_square(Vector2(1000, 110 + j*101), 100))
+  return engine
+
+def test_parallel_islands_match_sequential():
+  parallel = ParallelIslandSolver(SequentialImpulseSolver(4), workers=2, inline_threshold=1)
+  engines = [two_stacks(SequentialImpulseSolver(4)), two_stacks(parallel)]
+  with engines[1]:
+    for _ in range(30):
+      for e in engines:
+        e.update(1/60)
+  assert parallel.executor is None
+  # islands don't share movable bodies, so solving them apart gives the same result
+  for (a, b) in zip(engines[0].bodies, engines[1].bodies):
+    assert a.center_of_mass == b.center_of_mass
+    assert a.linear_velocity == b.linear_velocity
+    assert a.rotational_velocity == b.rotational_velocity
+  assert engines[0].contact_cache and engines[1].contact_cache
+  assert engines[0].contact_cache.impulses == engines[1].contact_cache.impulses
+
+def test_parallel_islands_with_overlapping_static_bodies():
+  # contacts between immovable bodies belong to no island
+  def scene(solver):
+    engine = two_stacks(solver)
+    engine.add_polygonal_body(get_square(Vector2(1500, 0), 100), True)
+    engine.add_polygonal_body(get_square(Vector2(1550, 0), 100), True)
+    return engine
+  parallel = ParallelIslandSolver(SequentialImpulseSolver(4), workers=2, inline_threshold=1)
+  engines = [scene(SequentialImpulseSolver(4)), scene(parallel)]
+  with engines[1]:
+    for _ in range(30):
+      for e in engines:
+        e.update(1/60)
+  for (a, b) in zip(engines[0].bodies, engines[1].bodies):
+    assert a.center_of_mass == b.center_of_mass
+    assert a.linear_velocity == b.linear_velocity
+
+def test_island_data_round_trip():
+  engine = two_stacks(SequentialImpulseSolver(4))
+  collusions = []
+  while not collusions:
+    collusions = engine.update(1/60)
+  island = ParallelIslandSolver(SequentialImpulseSolver(4)).split(collusions)[0]
+  data = pack_island(island)
+  # only the island's rows and shapes are sent, not the store of the world
+  assert len(data.rows) == len({b for col in island for b in (col.objA, col.objB)})
+  assert len(pickle.dumps(data)) < len(pickle.dumps(island))
+  copies = unpack_island(data)
+  for (col, copy) in zip(island, copies):
+    assert (copy.objA.body_id, copy.objB.body_id) == (col.objA.body_id, col.objB.body_id)
+    assert copy.objA.get_points_global() == col.objA.get_points_global()
+    assert copy.contact_points == col.contact_points and copy.feature_key == col.feature_key
@@ -0,0 +1,22 @@
+import sys
+import os
+root_dir = os.path.join(os.path.dirname(__file__), '../src')
+sys.path.append(root_dir)
+from timestep import FixedTimestep
+
+def test_fixed_timestep():
+  t = FixedTimestep(240, max_steps=8)
+  # 60 fps display, 4 physics steps per frame
+  assert [t.advance(1/60) for _ in range(3)] == [4, 4, 4]
+  # leftover time is carried over
+  t = FixedTimestep(100)
+  assert [t.advance(0.015) for _ in range(4)] == [1, 2, 1, 2]
+  assert t.advance(0.005) == 0
+  assert abs(t.alpha() - 0.5) < 1E-9
+
+def test_fixed_timestep_cap():
+  t = FixedTimestep(240, max_steps=8)
+  # a 1 second hitch only runs the cap, and the backlog is dropped
+  assert t.advance(1) == 8
+  assert t.accumulator <= t.dt
+  assert t.advance(1/60) <= 5